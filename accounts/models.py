@@ -7,6 +7,7 @@ from django.db.models import Avg
 from cloudinary.models import CloudinaryField
 from django.urls import reverse
 from listings.models import Review
+from listings.images import variant_url
 
 User = get_user_model()
 
@@ -36,7 +37,7 @@ class Profile(models.Model):
     @property
     def display_avatar_url(self):
         if self.avatar and hasattr(self.avatar, 'url'):
-            return self.avatar.url
+            return variant_url(self.avatar, 'avatar')
         return static('images/default_avatar.svg')
 
     @property
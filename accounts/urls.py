@@ -9,8 +9,10 @@ urlpatterns = [
     path('profile/', views.profile, name='profile'),
     path('dashboard/', views.dashboard, name='dashboard'),
     path('wishlist/', views.saved_listings, name='saved_listings'),
+    path('saved-searches/', views.saved_searches, name='saved_searches'),
     path('purchases/', views.order_history, name='order_history'),
     path('sales/', views.seller_orders, name='seller_orders'),
+    path('sales/export/', views.export_sales, name='export_sales'),
     path('user/<str:username>/', views.PublicProfileDetailView.as_view(), name='public_profile'),
     path('sales/update_status/<int:order_id>/', views.update_order_status, name='update_order_status'),
 ]
\ No newline at end of file
@@ -0,0 +1,10 @@
+# accounts/urls_api.py
+from django.urls import path
+from . import views
+
+app_name = 'accounts_api'
+
+urlpatterns = [
+    path('orders/', views.order_history_api, name='order_history'),
+    path('orders/<int:pk>/items/', views.order_items_api, name='order_items'),
+]
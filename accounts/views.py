@@ -1,22 +1,38 @@
 # accounts/views.py
 from django.shortcuts import render, redirect, get_object_or_404
+from django.http import JsonResponse, Http404, HttpResponseBadRequest, StreamingHttpResponse
+from django.template.loader import render_to_string
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.views.generic import DetailView
 from django.contrib.auth import get_user_model
 from django.urls import reverse
+from django.core.paginator import Paginator, InvalidPage
+from django.db import transaction
+from django.db.models import F, Prefetch
+from django.utils import timezone
+from datetime import timedelta
 from .forms import UserRegisterForm, UserUpdateForm, ProfileUpdateForm
 from listings.forms import OrderStatusForm
-from listings.models import Listing, SavedItem, Order
+from listings.models import Listing, SavedItem, Order, OrderItem, SellerOrder, SellerStats
+from listings.exports import EXPORT_FORMATS, aiter_sales_export, parse_export_date, sales_export_queryset
+from listings.images import variant_url
+from listings.sales_stats import record_status_change
+from listings.saved import saved_listing_ids
 from notifications.models import Notification
 
-# Import Coalesce and Value for the database query fix
-from django.db.models import Value
-from django.db.models.functions import Coalesce
-from decimal import Decimal
-
 User = get_user_model()
 
+ORDER_HISTORY_PER_PAGE = 10
+SELLER_ORDERS_PER_PAGE = 20
+SALES_CHART_DAYS = 30
+DASHBOARD_LISTINGS_PER_PAGE = 25
+# ?sort= values (optionally prefixed with '-') and the field each sorts by.
+DASHBOARD_SORT_FIELDS = {
+    'title': 'title', 'price': 'price', 'status': 'status', 'stock': 'stock', 'created': 'created',
+    'sold': 'units_sold', 'saves': 'saves', 'views': 'view_count', 'rating': 'average_rating',
+}
+
 
 def register(request):
     if request.method == 'POST':
@@ -54,8 +70,25 @@ def profile(request):
 
 @login_required
 def dashboard(request):
-    user_listings = Listing.objects.filter(seller=request.user).order_by('-created')
-    context = {'listings': user_listings}
+    """
+    One page of the seller's listings with their sales, saves, views and
+    rating, sortable by any column.
+    """
+    sort = request.GET.get('sort', '-created')
+    if sort.lstrip('-') not in DASHBOARD_SORT_FIELDS:
+        sort = '-created'
+    field = F(DASHBOARD_SORT_FIELDS[sort.lstrip('-')])
+    ordering = field.desc(nulls_last=True) if sort.startswith('-') else field.asc(nulls_last=True)
+
+    listings = Listing.objects.filter(seller=request.user).with_dashboard_stats().prefetch_related(
+        'images'
+    ).order_by(ordering, '-pk')
+    page_obj = Paginator(listings, DASHBOARD_LISTINGS_PER_PAGE).get_page(request.GET.get('page'))
+    context = {
+        'listings': page_obj.object_list,
+        'page_obj': page_obj,
+        'sort': sort,
+    }
     return render(request, 'accounts/dashboard.html', context)
 
 
@@ -66,47 +99,159 @@ def saved_listings(request):
     return render(request, 'accounts/saved_listings.html', context)
 
 
+@login_required
+def saved_searches(request):
+    searches = request.user.saved_searches.select_related('category')
+    return render(request, 'accounts/saved_searches.html', {'saved_searches': searches})
+
+
+def _order_history_paginator(request):
+    """
+    Pages of the user's orders, loading only the stored summary fields.
+    """
+    orders = Order.objects.filter(user=request.user).only(
+        'id', 'user_id', 'status', 'created_at', 'total_price', 'shipping_fee', 'credit_used',
+        'item_count', 'first_item_title', 'first_item_image',
+    ).order_by('-created_at', '-id')
+    return Paginator(orders, ORDER_HISTORY_PER_PAGE)
+
+
+def _order_summary(order):
+    return {
+        'id': order.pk,
+        'created_at': order.created_at.isoformat(),
+        'status': order.status,
+        'status_display': order.get_status_display(),
+        'total_price': str(order.total_price),
+        'item_count': order.item_count,
+        'first_item_title': order.first_item_title,
+        'thumbnail_url': variant_url(order.first_item_image, 'thumb'),
+        'receipt_url': reverse('listings:view_receipt', args=[order.pk]),
+        'items_url': reverse('accounts_api:order_items', args=[order.pk]),
+    }
+
+
 @login_required
 def order_history(request):
     """
-    Displays the user's purchase history, safely handling potential NULL values
-    in decimal fields for older orders.
+    Displays the first page of the user's purchase history as summary rows;
+    further pages and each order's items are fetched from the API on demand.
     """
-    orders = Order.objects.filter(user=request.user).annotate(
-        # If any of these fields are NULL in the DB, replace them with 0.00
-        total_price_clean=Coalesce('total_price', Value(Decimal('0.00'))),
-        shipping_fee_clean=Coalesce('shipping_fee', Value(Decimal('0.00'))),
-        credit_used_clean=Coalesce('credit_used', Value(Decimal('0.00')))
-    ).prefetch_related('items__listing').order_by('-created_at')
+    page_obj = _order_history_paginator(request).get_page(request.GET.get('page'))
+    return render(request, 'accounts/order_history.html', {'page_obj': page_obj, 'orders': page_obj.object_list})
 
-    return render(request, 'accounts/order_history.html', {'orders': orders})
+
+@login_required
+def order_history_api(request):
+    """
+    A page of order summary rows as JSON, plus their rendered HTML for the history page.
+    """
+    try:
+        page_obj = _order_history_paginator(request).page(request.GET.get('page', 1))
+    except InvalidPage:
+        raise Http404("No such page of orders.")
+    html = render_to_string('accounts/partials/order_summary_rows.html', {'orders': page_obj}, request=request)
+    return JsonResponse({
+        'orders': [_order_summary(order) for order in page_obj],
+        'html': html,
+        'next_page': page_obj.next_page_number() if page_obj.has_next() else None,
+    })
 
 
 @login_required
-def seller_orders(request):
-    orders = Order.objects.filter(items__listing__seller=request.user).distinct().order_by('-created_at')
-    orders = orders.prefetch_related('items__listing__images')
+def order_items_api(request, pk):
+    """
+    The items of one of the user's orders, fetched when its row is expanded.
+    """
+    order = get_object_or_404(Order.objects.only('id', 'user_id'), pk=pk, user=request.user)
+    items = order.items.select_related('listing').prefetch_related('listing__images').order_by('id')
+    html = render_to_string('accounts/partials/order_items.html', {'items': items}, request=request)
+    return JsonResponse({
+        'items': [
+            {
+                'product_title': item.product_title,
+                'quantity': item.quantity,
+                'price': str(item.price),
+                'total_price': str(item.total_price),
+                'listing_url': item.listing.get_absolute_url() if item.listing else None,
+            }
+            for item in items
+        ],
+        'html': html,
+    })
 
-    forms = {order.id: OrderStatusForm(instance=order) for order in orders}
+
+@login_required
+def seller_orders(request):
+    """
+    The seller's sales page: precomputed stats plus one page of orders, each
+    with only the seller's own items.
+    """
+    seller_items = OrderItem.objects.filter(seller=request.user).select_related(
+        'listing'
+    ).prefetch_related('listing__images')
+    seller_orders = SellerOrder.objects.filter(seller=request.user).select_related(
+        'order__user'
+    ).prefetch_related(
+        Prefetch('order__items', queryset=seller_items, to_attr='seller_items')
+    ).order_by('-created_at')
+    page_obj = Paginator(seller_orders, SELLER_ORDERS_PER_PAGE).get_page(request.GET.get('page'))
+
+    since = timezone.localdate() - timedelta(days=SALES_CHART_DAYS - 1)
     context = {
-        'orders': orders,
-        'forms': forms,
+        'page_obj': page_obj,
+        'seller_orders': page_obj.object_list,
+        'forms': {seller_order.order_id: OrderStatusForm(instance=seller_order.order) for seller_order in page_obj},
+        'stats': SellerStats.objects.filter(seller=request.user).first(),
+        'daily_sales': request.user.daily_sales.filter(date__gte=since).order_by('date'),
+        'top_listings': request.user.listing_sales.filter(items_sold__gt=0).order_by('-revenue')[:5],
     }
     return render(request, 'accounts/seller_orders.html', context)
 
 
 @login_required
-def update_order_status(request, order_id):
-    order = get_object_or_404(Order, id=order_id)
+async def export_sales(request):
+    """
+    Streams the seller's sales as CSV or JSON Lines, optionally limited to
+    orders placed between ?start= and ?end= (YYYY-MM-DD).
+    """
+    export_class = EXPORT_FORMATS.get(request.GET.get('format', 'csv'))
+    if export_class is None:
+        return HttpResponseBadRequest("Unknown export format.")
+    try:
+        start = parse_export_date(request.GET.get('start'))
+        end = parse_export_date(request.GET.get('end'))
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+
+    seller = await request.auser()
+    export = export_class()
+    response = StreamingHttpResponse(
+        aiter_sales_export(export, sales_export_queryset(seller, start, end)), content_type=export.content_type
+    )
+    filename = f"sales-{start or 'all'}-{end or timezone.localdate()}.{export.extension}"
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
 
-    if not order.is_seller(request.user):
+
+@login_required
+def update_order_status(request, order_id):
+    if not SellerOrder.objects.filter(seller=request.user, order_id=order_id).exists():
         messages.error(request, "You do not have permission to modify this order.")
         return redirect('accounts:seller_orders')
 
     if request.method == 'POST':
-        form = OrderStatusForm(request.POST, instance=order)
-        if form.is_valid():
-            form.save()
+        with transaction.atomic():
+            # Locked so concurrent updates by the order's sellers see each other's status.
+            order = Order.objects.select_for_update().get(pk=order_id)
+            old_status = order.status
+            form = OrderStatusForm(request.POST, instance=order)
+            updated = form.is_valid()
+            if updated:
+                form.save()
+                SellerOrder.objects.filter(order=order).update(status=order.status)
+                record_status_change(order, old_status)
+        if updated:
             messages.success(request, f"Order #{order.id} status has been updated.")
 
             message = f"The status of your order #{order.id} has been updated to '{order.get_status_display()}'."
@@ -135,14 +280,11 @@ class PublicProfileDetailView(DetailView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         user = self.get_object()
-        context['user_listings'] = Listing.objects.filter(seller=user, status='available').order_by('-created')
-
-        if self.request.user.is_authenticated:
-            context['saved_listing_ids'] = SavedItem.objects.filter(
-                user=self.request.user
-            ).values_list('listing__id', flat=True)
-        else:
-            context['saved_listing_ids'] = []
+        context['user_listings'] = Listing.objects.filter(
+            seller=user, status='available'
+        ).with_avg_rating().order_by('-created')
+
+        context['saved_listing_ids'] = saved_listing_ids(self.request.user)
 
         context['seller_average_rating'] = user.profile.get_seller_average_rating()
         return context
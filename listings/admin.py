@@ -1,6 +1,9 @@
 # listings/admin.py
 from django.contrib import admin
-from .models import Listing, ListingImage, SavedItem, Cart, CartItem, Order, OrderItem, Review, Category
+from .models import (
+    Listing, ListingImage, SavedItem, Cart, CartItem, Order, OrderItem, Review, Category,
+    SellerStats, SellerDailySales, SellerListingSales, ListingDailyViews, ListingPriceChange,
+)
 
 @admin.register(Listing)
 class ListingAdmin(admin.ModelAdmin):
@@ -20,4 +23,9 @@ admin.site.register(Cart)
 admin.site.register(CartItem)
 admin.site.register(OrderItem)
 admin.site.register(Review)
-admin.site.register(Category)
\ No newline at end of file
+admin.site.register(Category)
+admin.site.register(SellerStats)
+admin.site.register(SellerDailySales)
+admin.site.register(SellerListingSales)
+admin.site.register(ListingDailyViews)
+admin.site.register(ListingPriceChange)
@@ -0,0 +1,80 @@
+# listings/bulk.py
+"""
+Set-based bulk edits of listings.
+
+A bulk edit is a single UPDATE over the selected rows. The stock -> status
+rule of signals.auto_update_listing_status is expressed in SQL, since
+update() doesn't run pre_save, and updated_at is bumped in the same
+statement, which invalidates the cached cards and ETags of every row at once.
+A price change reads the old prices first so only rows whose price actually
+moved are appended to the price history.
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, DecimalField, ExpressionWrapper, F, Value, When
+from django.db.models.functions import Greatest, Now, Round
+from django.db.models.lookups import Exact, GreaterThan
+
+from .price_history import record_price_changes
+from .saved_searches import notify_saved_searches_on_commit
+
+
+def _price_expression(mode, value):
+    if mode == 'set':
+        return Value(value)
+    if mode == 'percent':
+        factor = Decimal('1') + value / Decimal('100')
+        return Round(
+            ExpressionWrapper(F('price') * Value(factor), output_field=DecimalField(max_digits=12, decimal_places=2)),
+            precision=2,
+        )
+    return None
+
+
+def _stock_expression(mode, value):
+    if mode == 'set':
+        return Value(value)
+    if mode == 'adjust':
+        return Greatest(F('stock') + value, Value(0))
+    return None
+
+
+def bulk_update_listings(queryset, price_mode='', price_value=None, stock_mode='', stock_value=None, status=''):
+    """
+    Applies a price change (absolute or %), a stock change (absolute or
+    relative) and/or a status to every listing in `queryset` in one UPDATE.
+    Returns the number of listings updated.
+    """
+    updates = {'updated_at': Now()}
+
+    price = _price_expression(price_mode, price_value)
+    if price is not None:
+        updates['price'] = price
+
+    new_status = Value(status) if status else F('status')
+    stock = _stock_expression(stock_mode, stock_value)
+    if stock is not None:
+        updates['stock'] = stock
+        # Column references on the right-hand side of an UPDATE read the old
+        # row, so `stock` here is the stock before the change.
+        new_status = Case(
+            When(Exact(stock, 0), stock__gt=0, then=Value('sold')),
+            When(GreaterThan(stock, 0), stock=0, then=Value('available')),
+            default=new_status,
+        )
+    updates['status'] = new_status
+
+    restockable = []
+    if stock is not None or status == 'available':
+        # Listings that may come back on sale, for the saved-search alerts.
+        restockable = list(queryset.exclude(status='available', stock__gt=0).values_list('pk', flat=True))
+    with transaction.atomic():
+        old_prices = {}
+        if price is not None:
+            old_prices = dict(queryset.select_for_update().order_by().values_list('pk', 'price'))
+        updated = queryset.update(**updates)
+        record_price_changes(old_prices)
+    if restockable:
+        notify_saved_searches_on_commit(restockable)
+    return updated
@@ -0,0 +1,112 @@
+# listings/conditional.py
+"""
+ETag / Last-Modified helpers for Django's @condition decorator.
+
+Every function here answers from a single aggregate or values() query so a
+repeat request can be answered with a 304 before any template is rendered.
+"""
+import hashlib
+
+from django.contrib import messages
+from django.db.models import Max, Count, Sum
+
+from .models import Listing
+from .saved import saved_listing_ids
+
+
+def make_etag(*parts):
+    """
+    Builds a strong ETag value from the given version parts.
+    """
+    return hashlib.sha1('|'.join(str(part) for part in parts).encode()).hexdigest()
+
+
+def listings_version(trending=False):
+    """
+    Returns the latest updated_at and the row count across all listings.
+    The count catches deletions, which don't move the max timestamp. With
+    `trending`, also a checksum of the trending scores, which are re-ranked
+    without touching updated_at.
+    """
+    aggregates = {'last_modified': Max('updated_at'), 'count': Count('id')}
+    if trending:
+        aggregates['trending'] = Sum('trending_score')
+    return Listing.objects.order_by().aggregate(**aggregates)
+
+
+def _neighbours_version(neighbour_ids):
+    if not neighbour_ids:
+        return None, 0
+    version = Listing.objects.filter(pk__in=neighbour_ids).order_by().aggregate(
+        last_modified=Max('updated_at'), count=Count('id')
+    )
+    return version['last_modified'], version['count']
+
+
+def _listing_detail_version(request, pk):
+    """
+    Returns the version parts for an anonymous view of a listing's detail page,
+    or None when the page can't be served conditionally. Memoized on the request
+    because @condition asks for the ETag and Last-Modified separately.
+    """
+    if hasattr(request, '_listing_detail_version'):
+        return request._listing_detail_version
+
+    version = None
+    # Logged-in pages carry per-user state (cart, notifications, review forms),
+    # and pending flash messages are rendered once, so neither can be reused.
+    if not request.user.is_authenticated and not len(messages.get_messages(request)):
+        listing = Listing.objects.filter(pk=pk).values(
+            'updated_at', 'seller_id', 'seller__first_name', 'seller__last_name', 'seller__profile__avatar',
+            'similar__computed_at', 'similar__neighbour_ids',
+        ).first()
+        if listing:
+            # The seller's rating spans all of their listings; reviews bump
+            # updated_at on the listing they belong to.
+            seller_last_modified = Listing.objects.filter(
+                seller_id=listing['seller_id']
+            ).order_by().aggregate(last_modified=Max('updated_at'))['last_modified']
+            # The similar listings block changes when its job reruns, and
+            # renders each neighbour, which may be edited, sold or deleted.
+            neighbours_last_modified, neighbour_count = _neighbours_version(listing['similar__neighbour_ids'])
+            version = {
+                'last_modified': max(filter(None, (listing['updated_at'], seller_last_modified,
+                                                   neighbours_last_modified))),
+                'seller': (listing['seller__first_name'], listing['seller__last_name'],
+                           listing['seller__profile__avatar']),
+                'similar': (listing['similar__computed_at'], neighbour_count),
+            }
+
+    request._listing_detail_version = version
+    return version
+
+
+def listing_detail_etag(request, pk, **kwargs):
+    version = _listing_detail_version(request, pk)
+    if version is None:
+        return None
+    return make_etag('listing_detail', pk, version['last_modified'].isoformat(), *version['seller'], *version['similar'])
+
+
+def listing_detail_last_modified(request, pk, **kwargs):
+    version = _listing_detail_version(request, pk)
+    return version['last_modified'] if version else None
+
+
+def filter_listings_etag(request):
+    """
+    The grid depends on the filter parameters, every listing it could contain
+    and, for logged-in users, which of them are saved.
+    """
+    version = listings_version(trending='trending_score' in request.GET.get('ordering', ''))
+    parts = ['filter_listings', request.GET.urlencode(), version['last_modified'], version['count'],
+             version.get('trending')]
+    if request.user.is_authenticated:
+        # The same cached set the grid is rendered from.
+        parts += [request.user.pk, *sorted(saved_listing_ids(request.user))]
+    return make_etag(*parts)
+
+
+def search_suggestions_etag(request):
+    version = listings_version()
+    return make_etag('search_suggestions', request.GET.get('q', ''), version['last_modified'], version['count'])
@@ -0,0 +1,150 @@
+# listings/copurchase.py
+"""
+"Customers also bought" recommendations from order history.
+
+update_co_purchases() reads the orders placed since its watermark, in order
+id chunks, and adds one to the CoPurchase count of every pair of listings
+bought together, storing the sparse matrix in both directions. Each chunk's
+counts and the watermark move in one transaction, so an interrupted run
+resumes where it stopped and no order is counted twice. The listings whose
+rows changed get their top ALSO_BOUGHT_COUNT partners re-ranked into
+AlsoBought, which the cart and receipt read with one query.
+"""
+from collections import Counter, defaultdict
+from datetime import timedelta
+from itertools import permutations
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import AlsoBought, CoPurchase, JobWatermark, Listing, OrderItem
+
+WATERMARK_JOB = 'co_purchases'
+ALSO_BOUGHT_COUNT = 8
+ORDER_CHUNK_SIZE = 1000
+# An order with more listings than this is a bulk buy, not a signal; only
+# its first listings are paired.
+MAX_LISTINGS_PER_ORDER = 20
+# Orders newer than this are left for the next run, so a checkout still
+# committing with a lower id than a committed one isn't skipped.
+WATERMARK_LAG = timedelta(minutes=5)
+
+
+def _pair_counts(order_rows):
+    """
+    Counts the listing pairs in (order_id, listing_id) rows, both ways round.
+    """
+    listings_by_order = defaultdict(list)
+    for order_id, listing_id in order_rows:
+        listings = listings_by_order[order_id]
+        if listing_id not in listings and len(listings) < MAX_LISTINGS_PER_ORDER:
+            listings.append(listing_id)
+    counts = Counter()
+    for listings in listings_by_order.values():
+        counts.update(permutations(listings, 2))
+    return counts
+
+
+def _add_pair_counts(counts):
+    existing = {
+        (row.listing_id, row.other_id): row
+        for row in CoPurchase.objects.filter(
+            listing_id__in={listing_id for listing_id, _ in counts},
+            other_id__in={other_id for _, other_id in counts},
+        )
+    }
+    changed, new = [], []
+    for pair, count in counts.items():
+        row = existing.get(pair)
+        if row is None:
+            new.append(CoPurchase(listing_id=pair[0], other_id=pair[1], count=count))
+        else:
+            row.count = F('count') + count
+            changed.append(row)
+    CoPurchase.objects.bulk_update(changed, ['count'], batch_size=500)
+    CoPurchase.objects.bulk_create(new, batch_size=500)
+
+
+def _rank_also_bought(listing_ids):
+    """
+    Stores the top partners of each listing in `listing_ids`.
+    """
+    partners = defaultdict(list)
+    rows = CoPurchase.objects.filter(listing_id__in=listing_ids).order_by('listing_id', '-count', '-other_id')
+    for listing_id, other_id in rows.values_list('listing_id', 'other_id'):
+        if len(partners[listing_id]) < ALSO_BOUGHT_COUNT:
+            partners[listing_id].append(other_id)
+
+    now = timezone.now()
+    AlsoBought.objects.bulk_create(
+        [AlsoBought(listing_id=listing_id, listing_ids=ids, computed_at=now) for listing_id, ids in partners.items()],
+        batch_size=500, update_conflicts=True, unique_fields=['listing'], update_fields=['listing_ids', 'computed_at'],
+    )
+
+
+def update_co_purchases():
+    """
+    Adds the orders placed since the last run to the co-purchase index.
+    Returns the number of orders processed.
+    """
+    watermark, _ = JobWatermark.objects.get_or_create(job=WATERMARK_JOB)
+    cutoff = timezone.now() - WATERMARK_LAG
+    processed = 0
+
+    while True:
+        rows = list(
+            OrderItem.objects.filter(
+                order_id__gt=watermark.position, order__created_at__lt=cutoff
+            ).order_by('order_id').values_list('order_id', flat=True).distinct()[:ORDER_CHUNK_SIZE]
+        )
+        if not rows:
+            return processed
+        last_order_id = rows[-1]
+
+        items = OrderItem.objects.filter(
+            order_id__gt=watermark.position, order_id__lte=last_order_id, listing__isnull=False
+        ).order_by('order_id', 'id').values_list('order_id', 'listing_id')
+        counts = _pair_counts(items)
+
+        with transaction.atomic():
+            _add_pair_counts(counts)
+            _rank_also_bought({listing_id for listing_id, _ in counts})
+            watermark.position = last_order_id
+            watermark.save(update_fields=['position', 'updated_at'])
+        processed += len(rows)
+
+
+def also_bought(listing_ids, exclude_seller=None, count=ALSO_BOUGHT_COUNT):
+    """
+    Available listings often bought with any of `listing_ids`, best first.
+    A partner's rank is summed across the given listings, so items bought
+    with several of them come first. Short lists are topped up with trending
+    listings from the same categories.
+    """
+    listing_ids = set(listing_ids)
+    if not listing_ids:
+        return []
+
+    scores = Counter()
+    for partners in AlsoBought.objects.filter(listing_id__in=listing_ids).values_list('listing_ids', flat=True):
+        for position, other_id in enumerate(partners):
+            scores[other_id] += ALSO_BOUGHT_COUNT - position
+    for listing_id in listing_ids:
+        scores.pop(listing_id, None)
+
+    available = Listing.objects.filter(status='available').prefetch_related('images')
+    if exclude_seller is not None:
+        available = available.exclude(seller=exclude_seller)
+
+    # A few spare candidates, as some may have sold out since the last run.
+    candidate_ids = [other_id for other_id, _ in scores.most_common(count * 2)]
+    by_pk = {listing.pk: listing for listing in available.filter(pk__in=candidate_ids)}
+    recommendations = [by_pk[pk] for pk in candidate_ids if pk in by_pk][:count]
+
+    if len(recommendations) < count:
+        exclude_ids = listing_ids | {listing.pk for listing in recommendations}
+        recommendations += available.filter(
+            category__in=Listing.objects.filter(pk__in=listing_ids).values('category')
+        ).exclude(pk__in=exclude_ids).order_by('-trending_score', '-created')[:count - len(recommendations)]
+    return recommendations
@@ -0,0 +1,119 @@
+# listings/exports.py
+"""
+Streaming exports of a seller's sales, one row per item sold.
+
+Rows are read from a values() query in chunks and formatted as they are
+read, so an export holds a single chunk in memory however many years of
+orders it covers. The web view streams with aiterator() (the site runs under
+ASGI); the export_sales command uses iterator().
+"""
+import csv
+import json
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .models import OrderItem
+
+EXPORT_CHUNK_SIZE = 2000
+
+SALES_EXPORT_FIELDS = (
+    'order_id', 'order_date', 'status', 'buyer', 'shipping_city',
+    'product_title', 'quantity', 'unit_price', 'line_total',
+)
+
+
+def parse_export_date(value):
+    """
+    Parses an optional YYYY-MM-DD date; raises ValueError when malformed.
+    """
+    if not value:
+        return None
+    day = parse_date(value)
+    if day is None:
+        raise ValueError(f"'{value}' is not a YYYY-MM-DD date.")
+    return day
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def sales_export_queryset(seller, start=None, end=None):
+    """
+    The seller's sold items with orders placed from `start` to `end`
+    (inclusive dates, either optional), oldest first.
+    """
+    items = OrderItem.objects.filter(seller=seller)
+    if start:
+        items = items.filter(order__created_at__gte=_day_start(start))
+    if end:
+        items = items.filter(order__created_at__lt=_day_start(end + timedelta(days=1)))
+    # values() rather than values_list(): aiterator() needs the lazy row generator.
+    return items.order_by('order__created_at', 'order_id', 'id').values(
+        'order_id', 'order__created_at', 'order__status', 'order__full_name', 'order__shipping_city',
+        'product_title', 'quantity', 'price',
+    )
+
+
+def _record(row):
+    return (
+        row['order_id'], row['order__created_at'].isoformat(), row['order__status'], row['order__full_name'],
+        row['order__shipping_city'], row['product_title'], row['quantity'], str(row['price']),
+        str(row['quantity'] * row['price']),
+    )
+
+
+class _Echo:
+    """File-like object whose write() hands the line back to csv.writer's caller."""
+
+    def write(self, value):
+        return value
+
+
+class CsvExport:
+    content_type = 'text/csv'
+    extension = 'csv'
+
+    def __init__(self):
+        self._writer = csv.writer(_Echo())
+
+    def header(self):
+        return self._writer.writerow(SALES_EXPORT_FIELDS)
+
+    def line(self, row):
+        return self._writer.writerow(_record(row))
+
+
+class JsonLinesExport:
+    content_type = 'application/x-ndjson'
+    extension = 'jsonl'
+
+    def header(self):
+        return ''
+
+    def line(self, row):
+        return json.dumps(dict(zip(SALES_EXPORT_FIELDS, _record(row)))) + '\n'
+
+
+EXPORT_FORMATS = {
+    'csv': CsvExport,
+    'jsonl': JsonLinesExport,
+}
+
+
+def iter_sales_export(export, queryset):
+    header = export.header()
+    if header:
+        yield header
+    for row in queryset.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield export.line(row)
+
+
+async def aiter_sales_export(export, queryset):
+    header = export.header()
+    if header:
+        yield header
+    async for row in queryset.aiterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield export.line(row)
@@ -11,6 +11,19 @@ CONDITION_CHOICES = [
 ]
 
 
+class ListingOrderingFilter(django_filters.OrderingFilter):
+    """
+    OrderingFilter that breaks ties by newest, so pages of equal prices or
+    trending scores don't overlap.
+    """
+
+    def filter(self, qs, value):
+        qs = super().filter(qs, value)
+        if value:
+            qs = qs.order_by(*qs.query.order_by, '-created', '-pk')
+        return qs
+
+
 class ListingFilter(django_filters.FilterSet):
     q = django_filters.CharFilter(
         field_name='title',
@@ -49,8 +62,9 @@ class ListingFilter(django_filters.FilterSet):
         widget=forms.Select(attrs={'class': 'form-select'})
     )
 
-    ordering = django_filters.OrderingFilter(
+    ordering = ListingOrderingFilter(
         choices=(
+            ('-trending_score', 'Trending'),
             ('-created', 'Newest First'),
             ('price', 'Price: Low to High'),
             ('-price', 'Price: High to Low'),
@@ -77,4 +77,45 @@ class OrderStatusForm(forms.ModelForm):
         fields = ['status']
         widgets = {
             'status': forms.Select(attrs={'class': 'form-select form-select-sm'})
-        }
\ No newline at end of file
+        }
+
+
+class BulkListingUpdateForm(forms.Form):
+    """
+    Form for changing the price, stock and/or status of many of a seller's
+    listings at once.
+    """
+    PRICE_MODES = [('', 'Keep price'), ('set', 'Set price to'), ('percent', 'Change price by %')]
+    STOCK_MODES = [('', 'Keep stock'), ('set', 'Set stock to'), ('adjust', 'Adjust stock by')]
+
+    listings = forms.ModelMultipleChoiceField(queryset=Listing.objects.none())
+    price_mode = forms.ChoiceField(choices=PRICE_MODES, required=False)
+    price_value = forms.DecimalField(max_digits=12, decimal_places=2, required=False)
+    stock_mode = forms.ChoiceField(choices=STOCK_MODES, required=False)
+    stock_value = forms.IntegerField(required=False)
+    status = forms.ChoiceField(choices=[('', 'Keep status')] + list(Listing.STATUS_CHOICES), required=False)
+
+    def __init__(self, *args, seller, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['listings'].queryset = Listing.objects.filter(seller=seller)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        price_mode, price_value = cleaned_data.get('price_mode'), cleaned_data.get('price_value')
+        stock_mode, stock_value = cleaned_data.get('stock_mode'), cleaned_data.get('stock_value')
+
+        if price_mode and price_value is None:
+            self.add_error('price_value', "Enter the new price or percentage.")
+        elif price_mode == 'set' and price_value < 0:
+            self.add_error('price_value', "The price can't be negative.")
+        elif price_mode == 'percent' and price_value <= -100:
+            self.add_error('price_value', "A price can't be reduced by 100% or more.")
+
+        if stock_mode and stock_value is None:
+            self.add_error('stock_value', "Enter the new stock or adjustment.")
+        elif stock_mode == 'set' and stock_value < 0:
+            self.add_error('stock_value', "Stock can't be negative.")
+
+        if not (price_mode or stock_mode or cleaned_data.get('status')):
+            raise forms.ValidationError("Choose a change to apply.")
+        return cleaned_data
@@ -0,0 +1,147 @@
+# listings/imports.py
+"""
+Bulk listing import from CSV.
+
+Each row is validated with ListingImportForm (ListingForm, with the category
+given by slug and resolved from a map loaded once per import), and valid
+listings are written with bulk_create in batches, each batch in its own
+transaction. The file is read row by row, so memory is bounded by the batch
+size rather than the file size.
+"""
+import csv
+from dataclasses import dataclass, field
+
+from django import forms
+from django.db import transaction
+
+from .forms import ListingForm
+from .models import Category, Listing, ListingImage
+from .saved_searches import notify_saved_searches_on_commit
+from .uploads import UPLOAD_PENDING, enqueue_uploads
+
+IMPORT_BATCH_SIZE = 500
+# Errors beyond this many are counted but not kept.
+MAX_REPORTED_ERRORS = 1000
+MAX_IMAGES_PER_ROW = 10
+
+IMPORT_COLUMNS = (
+    'title', 'description', 'price', 'condition', 'category', 'city',
+    'status', 'featured', 'latitude', 'longitude', 'stock', 'image_urls',
+)
+# Used when a column is missing or blank, as on the create form.
+IMPORT_DEFAULTS = {'condition': 'USED', 'status': 'available', 'stock': '1'}
+_TRUE_VALUES = {'1', 'true', 'yes', 'y'}
+
+
+class ListingImportForm(ListingForm):
+    """
+    ListingForm for a CSV row: the category is a leaf category's slug.
+    """
+    category = forms.CharField()
+
+    def __init__(self, *args, category_map, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.category_map = category_map
+
+    def clean_category(self):
+        slug = self.cleaned_data['category'].strip()
+        try:
+            return self.category_map[slug]
+        except KeyError:
+            raise forms.ValidationError(f"Unknown category '{slug}'. Use the slug of a category without subcategories.")
+
+
+def leaf_category_map():
+    """Maps slugs to the categories a listing can be filed under."""
+    return {category.slug: category for category in Category.objects.filter(children__isnull=True)}
+
+
+@dataclass
+class ImportResult:
+    created: int = 0
+    images_queued: int = 0
+    error_count: int = 0
+    # (line number, {field: [messages]}) for the first MAX_REPORTED_ERRORS bad rows.
+    errors: list = field(default_factory=list)
+
+    def add_error(self, line_number, errors):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line_number, errors))
+
+
+def _row_data(row):
+    data = dict(IMPORT_DEFAULTS)
+    for column in IMPORT_COLUMNS:
+        value = (row.get(column) or '').strip()
+        if value:
+            data[column] = value
+    if data.get('featured', '').lower() not in _TRUE_VALUES:
+        data.pop('featured', None)
+    return data
+
+
+def _image_urls(data):
+    urls = [url.strip() for url in data.get('image_urls', '').split('|') if url.strip()]
+    invalid = [url for url in urls if not url.startswith(('http://', 'https://')) or len(url) > 255]
+    return urls, invalid
+
+
+def _write_batch(batch, result):
+    """
+    Creates one batch of listings and queues their images for upload.
+    """
+    with transaction.atomic():
+        listings = Listing.objects.bulk_create([listing for listing, _ in batch])
+        images = ListingImage.objects.bulk_create([
+            ListingImage(listing=listing, staged_path=url, upload_status=UPLOAD_PENDING)
+            for listing, (_, urls) in zip(listings, batch)
+            for url in urls
+        ])
+        # The upload backend accepts remote URLs as well as staged files.
+        enqueue_uploads(images)
+        # bulk_create() skips post_save, so alert saved searches here.
+        notify_saved_searches_on_commit(listing.pk for listing in listings)
+    result.created += len(listings)
+    result.images_queued += len(images)
+
+
+def import_listings(seller, csv_file, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Imports listings for `seller` from a text-mode CSV file with a header row
+    naming IMPORT_COLUMNS. Invalid rows are skipped and reported; valid rows
+    are created even when others fail.
+    """
+    category_map = leaf_category_map()
+    result = ImportResult()
+    batch = []
+
+    reader = csv.DictReader(csv_file)
+    missing = {'title', 'price', 'category', 'city'} - set(reader.fieldnames or ())
+    if missing:
+        result.add_error(1, {'__all__': [f"Missing column(s): {', '.join(sorted(missing))}."]})
+        return result
+
+    for row in reader:
+        data = _row_data(row)
+        form = ListingImportForm(data, category_map=category_map)
+        urls, invalid_urls = _image_urls(data)
+        if not form.is_valid() or invalid_urls or len(urls) > MAX_IMAGES_PER_ROW:
+            errors = {name: list(messages) for name, messages in form.errors.items()}
+            if invalid_urls:
+                errors['image_urls'] = [f"Not an http(s) URL of up to 255 characters: {url}" for url in invalid_urls]
+            elif len(urls) > MAX_IMAGES_PER_ROW:
+                errors['image_urls'] = [f"At most {MAX_IMAGES_PER_ROW} images per listing."]
+            result.add_error(reader.line_num, errors)
+            continue
+
+        listing = form.save(commit=False)
+        listing.seller = seller
+        batch.append((listing, urls))
+        if len(batch) >= batch_size:
+            _write_batch(batch, result)
+            batch = []
+
+    if batch:
+        _write_batch(batch, result)
+    return result
@@ -0,0 +1,37 @@
+# listings/management/commands/export_sales.py
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from listings.exports import EXPORT_FORMATS, iter_sales_export, parse_export_date, sales_export_queryset
+
+
+class Command(BaseCommand):
+    help = "Streams a seller's sales as CSV or JSON Lines to stdout or a file."
+
+    def add_arguments(self, parser):
+        parser.add_argument('username', help="The seller whose sales to export.")
+        parser.add_argument('--format', choices=sorted(EXPORT_FORMATS), default='csv')
+        parser.add_argument('--start', help="First order date to include (YYYY-MM-DD).")
+        parser.add_argument('--end', help="Last order date to include (YYYY-MM-DD).")
+        parser.add_argument('--output', help="File to write to instead of stdout.")
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        try:
+            seller = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"No user named '{options['username']}'.")
+        try:
+            start = parse_export_date(options['start'])
+            end = parse_export_date(options['end'])
+        except ValueError as e:
+            raise CommandError(e)
+
+        export = EXPORT_FORMATS[options['format']]()
+        lines = iter_sales_export(export, sales_export_queryset(seller, start, end))
+        if options['output']:
+            with open(options['output'], 'w', newline='', encoding='utf-8') as output:
+                output.writelines(lines)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending='')
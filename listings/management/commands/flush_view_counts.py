@@ -0,0 +1,20 @@
+# listings/management/commands/flush_view_counts.py
+from django.core.management.base import BaseCommand, CommandError
+
+from listings.view_counts import flush_view_counts, get_view_count_backend
+
+
+class Command(BaseCommand):
+    help = (
+        "Writes buffered listing views to the database (run from cron when traffic is too low to flush on its own). "
+        "Needs the Redis backend: the in-memory buffer lives in the web process and can't be reached from here."
+    )
+
+    def handle(self, *args, **options):
+        if not get_view_count_backend().shared:
+            raise CommandError(
+                "The view count buffer is in the web process's memory, so there is nothing to flush from here. "
+                "Set REDIS_URL to use the shared Redis buffer."
+            )
+        views = flush_view_counts()
+        self.stdout.write(self.style.SUCCESS(f"Flushed {views} listing views."))
@@ -0,0 +1,34 @@
+# listings/management/commands/import_listings.py
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from listings.imports import IMPORT_BATCH_SIZE, IMPORT_COLUMNS, import_listings
+
+
+class Command(BaseCommand):
+    help = f"Imports listings for a seller from a CSV file with the columns: {', '.join(IMPORT_COLUMNS)}."
+
+    def add_arguments(self, parser):
+        parser.add_argument('username', help="The seller the listings belong to.")
+        parser.add_argument('csv_path')
+        parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        try:
+            seller = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"No user named '{options['username']}'.")
+
+        with open(options['csv_path'], newline='', encoding='utf-8-sig') as csv_file:
+            result = import_listings(seller, csv_file, batch_size=options['batch_size'])
+
+        for line_number, errors in result.errors:
+            for field_name, messages in errors.items():
+                self.stderr.write(f"Line {line_number}, {field_name}: {' '.join(messages)}")
+        if result.error_count > len(result.errors):
+            self.stderr.write(f"... and {result.error_count - len(result.errors)} more rows with errors.")
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {result.created} listings ({result.images_queued} images queued); "
+            f"{result.error_count} rows skipped."
+        ))
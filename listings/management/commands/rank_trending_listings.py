@@ -0,0 +1,12 @@
+# listings/management/commands/rank_trending_listings.py
+from django.core.management.base import BaseCommand
+
+from listings.trending import rank_trending_listings
+
+
+class Command(BaseCommand):
+    help = "Recomputes the trending score of every listing from recent views, saves, cart adds and orders (run periodically)."
+
+    def handle(self, *args, **options):
+        updated = rank_trending_listings()
+        self.stdout.write(self.style.SUCCESS(f"Updated the trending score of {updated} listings."))
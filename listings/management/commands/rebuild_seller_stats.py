@@ -0,0 +1,12 @@
+# listings/management/commands/rebuild_seller_stats.py
+from django.core.management.base import BaseCommand
+
+from listings.sales_stats import rebuild_seller_stats
+
+
+class Command(BaseCommand):
+    help = "Recomputes the seller sales stats tables from all orders (e.g. after manual edits; migration 0024 did the initial backfill)."
+
+    def handle(self, *args, **options):
+        sellers = rebuild_seller_stats()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt sales stats for {sellers} sellers."))
@@ -0,0 +1,15 @@
+# listings/management/commands/refresh_similar_listings.py
+from django.core.management.base import BaseCommand
+
+from listings.similar import refresh_similar_listings
+
+
+class Command(BaseCommand):
+    help = "Recomputes the similar listings shown on detail pages for new and changed listings (run periodically)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help="Recompute every listing's list, not just new and changed ones.")
+
+    def handle(self, *args, **options):
+        written = refresh_similar_listings(full=options['full'])
+        self.stdout.write(self.style.SUCCESS(f"Updated the similar listings of {written} listings."))
@@ -0,0 +1,30 @@
+# listings/management/commands/retry_image_uploads.py
+import os
+
+from django.core.management.base import BaseCommand
+
+from listings.models import ListingImage
+from listings.uploads import process_upload, UPLOAD_PENDING, UPLOAD_FAILED
+from messaging.models import Message
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-runs background image uploads that are still pending or have failed (e.g. after a restart). "
+        "Files whose staging disk didn't survive the restart can't be recovered and are reported as missing."
+    )
+
+    def handle(self, *args, **options):
+        for model in (ListingImage, Message):
+            rows = model.objects.filter(
+                upload_status__in=[UPLOAD_PENDING, UPLOAD_FAILED]
+            ).exclude(staged_path='').values_list('pk', 'staged_path')
+            for pk, staged_path in rows.iterator():
+                # Imported listings stage remote URLs rather than local files.
+                is_url = staged_path.startswith(('http://', 'https://'))
+                if not is_url and not os.path.exists(staged_path):
+                    self.stderr.write(f"{model._meta.label} #{pk}: staged file {staged_path} is missing.")
+                    continue
+                process_upload(model._meta.label, pk)
+                status = model.objects.filter(pk=pk).values_list('upload_status', flat=True).first()
+                self.stdout.write(f"{model._meta.label} #{pk}: {status}")
@@ -0,0 +1,12 @@
+# listings/management/commands/send_price_drop_alerts.py
+from django.core.management.base import BaseCommand
+
+from listings.price_history import send_price_drop_alerts
+
+
+class Command(BaseCommand):
+    help = "Notifies users whose saved listings dropped in price since the last run (run periodically)."
+
+    def handle(self, *args, **options):
+        sent = send_price_drop_alerts()
+        self.stdout.write(self.style.SUCCESS(f"Sent {sent} price drop notifications."))
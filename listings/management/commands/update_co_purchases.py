@@ -0,0 +1,12 @@
+# listings/management/commands/update_co_purchases.py
+from django.core.management.base import BaseCommand
+
+from listings.copurchase import update_co_purchases
+
+
+class Command(BaseCommand):
+    help = "Adds orders placed since the last run to the \"customers also bought\" index (run periodically)."
+
+    def handle(self, *args, **options):
+        orders = update_co_purchases()
+        self.stdout.write(self.style.SUCCESS(f"Processed {orders} orders."))
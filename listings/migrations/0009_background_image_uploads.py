@@ -0,0 +1,29 @@
+# Generated by Django 5.2.5 on 2026-10-19 19:54
+
+import cloudinary.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0008_listing_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='listingimage',
+            name='staged_path',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='listingimage',
+            name='upload_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('done', 'Done'), ('failed', 'Failed')], default='done', max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='listingimage',
+            name='image',
+            field=cloudinary.models.CloudinaryField(blank=True, max_length=255, null=True, verbose_name='listing_image'),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.5 on 2026-10-19 20:08
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery, Sum
+
+
+def backfill_seller_orders(apps, schema_editor):
+    # Items whose listing is already gone can't be attributed to a seller.
+    OrderItem = apps.get_model('listings', 'OrderItem')
+    Listing = apps.get_model('listings', 'Listing')
+    SellerOrder = apps.get_model('listings', 'SellerOrder')
+    OrderItem.objects.filter(listing__isnull=False).update(
+        seller=Subquery(Listing.objects.filter(pk=OuterRef('listing_id')).values('seller_id')[:1])
+    )
+    shares = OrderItem.objects.filter(seller__isnull=False).order_by().values(
+        'seller_id', 'order_id', 'order__status', 'order__created_at'
+    ).annotate(item_count=Sum('quantity'), subtotal=Sum(F('quantity') * F('price')))
+    SellerOrder.objects.bulk_create(
+        SellerOrder(seller_id=row['seller_id'], order_id=row['order_id'], item_count=row['item_count'],
+                    subtotal=row['subtotal'], status=row['order__status'], created_at=row['order__created_at'])
+        for row in shares.iterator()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0010_seller_sales_stats'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderitem',
+            name='seller',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='sold_items', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.CreateModel(
+            name='SellerOrder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('item_count', models.PositiveIntegerField()),
+                ('subtotal', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('shipped', 'Shipped'), ('delivered', 'Delivered'), ('cancelled', 'Cancelled')], default='pending', max_length=20)),
+                ('created_at', models.DateTimeField()),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='seller_orders', to='listings.order')),
+                ('seller', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='seller_orders', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['seller', '-created_at'], name='listings_se_seller__5c2305_idx')],
+                'unique_together': {('seller', 'order')},
+            },
+        ),
+        migrations.RunPython(backfill_seller_orders, migrations.RunPython.noop),
+    ]
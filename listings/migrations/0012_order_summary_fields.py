@@ -0,0 +1,55 @@
+# Generated by Django 5.2.5 on 2026-10-19 20:09
+
+import cloudinary.models
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_order_summaries(apps, schema_editor):
+    Order = apps.get_model('listings', 'Order')
+    OrderItem = apps.get_model('listings', 'OrderItem')
+    ListingImage = apps.get_model('listings', 'ListingImage')
+    for order in Order.objects.iterator(chunk_size=500):
+        items = list(OrderItem.objects.filter(order_id=order.pk).order_by('id').values_list(
+            'listing_id', 'product_title', 'quantity'
+        ))
+        if not items:
+            continue
+        listing_id, title, _ = items[0]
+        image = ListingImage.objects.filter(listing_id=listing_id, image__isnull=False).exclude(
+            image=''
+        ).order_by('id').values_list('image', flat=True).first() if listing_id else None
+        Order.objects.filter(pk=order.pk).update(
+            item_count=len(items), first_item_title=title, first_item_image=image
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0011_seller_order_projection'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='first_item_image',
+            field=cloudinary.models.CloudinaryField(blank=True, max_length=255, null=True, verbose_name='first_item_image'),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='first_item_title',
+            field=models.CharField(blank=True, max_length=200),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='item_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['user', '-created_at'], name='listings_or_user_id_39c845_idx'),
+        ),
+        migrations.RunPython(backfill_order_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.5 on 2026-10-19 20:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0013_listing_dashboard_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ListingDailyViews',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('views', models.PositiveIntegerField(default=0)),
+                ('listing', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_views', to='listings.listing')),
+            ],
+            options={
+                'verbose_name_plural': 'Listing daily views',
+                'ordering': ['-date'],
+                'indexes': [models.Index(fields=['date'], name='listings_li_date_b7d8f3_idx')],
+                'unique_together': {('listing', 'date')},
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.5 on 2026-10-19 20:19
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0014_listing_daily_views'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # Added without a default so existing cart items stay NULL rather than
+        # all counting as added today; only new rows get timezone.now.
+        migrations.AddField(
+            model_name='cartitem',
+            name='added_at',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.AlterField(
+            model_name='cartitem',
+            name='added_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, null=True),
+        ),
+        migrations.AddField(
+            model_name='listing',
+            name='trending_score',
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(fields=['-trending_score'], name='listings_li_trendin_5996a3_idx'),
+        ),
+    ]
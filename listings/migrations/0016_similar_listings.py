@@ -0,0 +1,25 @@
+# Generated by Django 5.2.5 on 2026-10-19 20:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0015_listing_trending_score'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SimilarListings',
+            fields=[
+                ('listing', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='similar', serialize=False, to='listings.listing')),
+                ('neighbour_ids', models.JSONField(default=list)),
+                ('computed_at', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name_plural': 'Similar listings',
+            },
+        ),
+    ]
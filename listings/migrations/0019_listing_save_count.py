@@ -0,0 +1,30 @@
+# Generated by Django 5.2.5 on 2026-10-19 20:25
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_save_counts(apps, schema_editor):
+    Listing = apps.get_model('listings', 'Listing')
+    SavedItem = apps.get_model('listings', 'SavedItem')
+    saves = SavedItem.objects.filter(listing_id=OuterRef('pk')).order_by().values('listing_id').annotate(
+        count=Count('id')
+    ).values('count')
+    Listing.objects.update(save_count=Coalesce(Subquery(saves), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0018_recently_viewed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='listing',
+            name='save_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_save_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+from django.db import migrations
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_order_lines(apps, schema_editor):
+    """Order.item_count was backfilled as units; it counts order lines."""
+    Order = apps.get_model('listings', 'Order')
+    OrderItem = apps.get_model('listings', 'OrderItem')
+    lines = OrderItem.objects.filter(order_id=OuterRef('pk')).order_by().values('order_id').annotate(
+        count=Count('id')
+    ).values('count')
+    Order.objects.update(item_count=Coalesce(Subquery(lines), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0021_listing_price_history'),
+    ]
+
+    operations = [
+        migrations.RunPython(count_order_lines, migrations.RunPython.noop),
+    ]
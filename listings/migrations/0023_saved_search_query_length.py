@@ -0,0 +1,37 @@
+# Generated by Django 5.2.5 on 2026-10-19 20:40
+
+from django.conf import settings
+import re
+
+from django.db import migrations, models
+
+
+def truncate_long_queries(apps, schema_editor):
+    """Cuts queries to the new length, re-deriving their token as SavedSearch.save() does."""
+    SavedSearch = apps.get_model('listings', 'SavedSearch')
+    for saved_search in SavedSearch.objects.filter(query__regex=r'^.{101,}$'):
+        saved_search.query = saved_search.query[:100].strip()
+        words = re.findall(r'\w+', saved_search.query.lower())
+        saved_search.query_token = max(words, key=len)[:12] if words else ''
+        saved_search.save(update_fields=['query', 'query_token'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0022_order_item_count_lines'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(truncate_long_queries, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='savedsearch',
+            name='query',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.AddIndex(
+            model_name='savedsearch',
+            index=models.Index(fields=['min_price', 'max_price'], name='listings_sa_min_pri_80a895_idx'),
+        ),
+    ]
@@ -0,0 +1,63 @@
+from django.db import migrations
+from django.db.models import Count, F, Max, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+
+def backfill_seller_stats(apps, schema_editor):
+    """
+    Fills the seller stats tables from the existing orders, as
+    sales_stats.rebuild_seller_stats() does. Until this runs, checkout only
+    adds new orders' deltas, so older sales were missing from dashboards.
+    """
+    OrderItem = apps.get_model('listings', 'OrderItem')
+    SellerStats = apps.get_model('listings', 'SellerStats')
+    SellerDailySales = apps.get_model('listings', 'SellerDailySales')
+    SellerListingSales = apps.get_model('listings', 'SellerListingSales')
+    SellerStats.objects.all().delete()
+    SellerDailySales.objects.all().delete()
+    SellerListingSales.objects.all().delete()
+
+    items = OrderItem.objects.filter(seller__isnull=False).order_by()
+    line_total = Sum(F('quantity') * F('price'))
+    now = timezone.now()
+
+    stats = {}
+    for row in items.values('seller_id', 'order__status').annotate(orders=Count('order', distinct=True)):
+        seller_stats = stats.setdefault(row['seller_id'], SellerStats(seller_id=row['seller_id'], updated_at=now))
+        setattr(seller_stats, f"{row['order__status']}_orders", row['orders'])
+
+    sales = items.exclude(order__status='cancelled')
+    for row in sales.values('seller_id').annotate(items=Sum('quantity'), revenue=line_total):
+        stats[row['seller_id']].items_sold = row['items']
+        stats[row['seller_id']].revenue = row['revenue']
+    SellerStats.objects.bulk_create(stats.values(), batch_size=500)
+
+    daily = sales.annotate(date=TruncDate('order__created_at')).values('seller_id', 'date').annotate(
+        orders=Count('order', distinct=True), items=Sum('quantity'), revenue=line_total
+    )
+    SellerDailySales.objects.bulk_create(
+        (SellerDailySales(seller_id=row['seller_id'], date=row['date'], orders=row['orders'],
+                          items_sold=row['items'], revenue=row['revenue']) for row in daily),
+        batch_size=500,
+    )
+
+    per_listing = sales.filter(listing__isnull=False).values('seller_id', 'listing_id').annotate(
+        title=Max('product_title'), items=Sum('quantity'), revenue=line_total
+    )
+    SellerListingSales.objects.bulk_create(
+        (SellerListingSales(seller_id=row['seller_id'], listing_id=row['listing_id'], product_title=row['title'],
+                            items_sold=row['items'], revenue=row['revenue']) for row in per_listing),
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0023_saved_search_query_length'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_seller_stats, migrations.RunPython.noop),
+    ]
@@ -1,11 +1,17 @@
 # listings/models.py
+import re
+from urllib.parse import urlencode
+
 from django.db import models
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 from django.utils import timezone
-from django.db.models import Avg, Sum, F
+from django.db.models import Avg, F, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
 from cloudinary.models import CloudinaryField
 
+from .uploads import UPLOAD_STATUS_CHOICES, UPLOAD_DONE
+
 User = get_user_model()
 
 
@@ -35,6 +41,26 @@ class ListingQuerySet(models.QuerySet):
     def with_avg_rating(self):
         return self.annotate(average_rating=Avg('reviews__rating'))
 
+    def with_dashboard_stats(self):
+        """
+        Annotates units_sold, saves and average_rating for the seller dashboard.
+        Saves are the stored save_count; the others are correlated subqueries
+        on an indexed foreign key rather than joins, so the figures don't
+        multiply each other and a page of listings costs one query.
+        """
+        def per_listing(model, aggregate):
+            rows = model.objects.filter(listing=OuterRef('pk')).order_by().values('listing')
+            return Subquery(rows.annotate(value=aggregate).values('value'))
+
+        return self.annotate(
+            units_sold=Coalesce(
+                Subquery(SellerListingSales.objects.filter(listing=OuterRef('pk')).values('items_sold')[:1]),
+                Value(0), output_field=IntegerField(),
+            ),
+            saves=F('save_count'),
+            average_rating=per_listing(Review, Avg('rating')),
+        )
+
 
 class Listing(models.Model):
     STATUS_CHOICES = (
@@ -56,14 +82,23 @@ class Listing(models.Model):
     latitude = models.FloatField(null=True, blank=True)
     longitude = models.FloatField(null=True, blank=True)
     created = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="available")
     featured = models.BooleanField(default=False)
     stock = models.PositiveIntegerField(default=1)
     condition = models.CharField(max_length=4, choices=CONDITION_CHOICES, default="USED")
+    view_count = models.PositiveIntegerField(default=0, editable=False)
+    save_count = models.PositiveIntegerField(default=0, editable=False)
+    # Decayed popularity, recomputed by listings/trending.py.
+    trending_score = models.FloatField(default=0, editable=False)
     objects = ListingQuerySet.as_manager()
 
     class Meta:
         ordering = ["-featured", "-created"]
+        indexes = [
+            models.Index(fields=['seller', '-created']),
+            models.Index(fields=['-trending_score']),
+        ]
 
     def __str__(self):
         return f"{self.title} — {self.price}"
@@ -78,8 +113,11 @@ class Listing(models.Model):
 
 class ListingImage(models.Model):
     listing = models.ForeignKey(Listing, related_name="images", on_delete=models.CASCADE)
-    image = CloudinaryField('listing_image')
+    # Empty until the background upload of staged_path finishes (see uploads.py).
+    image = CloudinaryField('listing_image', blank=True, null=True)
     caption = models.CharField(max_length=200, blank=True)
+    upload_status = models.CharField(max_length=10, choices=UPLOAD_STATUS_CHOICES, default=UPLOAD_DONE)
+    staged_path = models.CharField(max_length=255, blank=True)
 
     def __str__(self):
         return f"Image for {self.listing.title}"
@@ -130,6 +168,8 @@ class CartItem(models.Model):
     cart = models.ForeignKey(Cart, on_delete=models.CASCADE, related_name='items')
     listing = models.ForeignKey(Listing, on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField(default=1)
+    # NULL for items added before this was tracked; they never count as trending cart adds.
+    added_at = models.DateTimeField(default=timezone.now, null=True)
 
     @property
     def total_price(self):
@@ -162,10 +202,26 @@ class Order(models.Model):
     credit_used = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
     total_price = models.DecimalField(max_digits=12, decimal_places=2, default=0.00)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Summary shown in the order history without loading the items; set at checkout.
+    # item_count is the number of order lines, not units.
+    item_count = models.PositiveIntegerField(default=0)
+    first_item_title = models.CharField(max_length=200, blank=True)
+    first_item_image = CloudinaryField('first_item_image', blank=True, null=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['user', '-created_at'])]
 
     def __str__(self):
         return f"Order #{self.id} by {self.user.username}"
 
+    def set_summary(self, cart_items):
+        """Fills the summary fields from the cart items being ordered, in pk order."""
+        first_listing = cart_items[0].listing
+        first_image = first_listing.images.filter(image__isnull=False).exclude(image='').order_by('id').first()
+        self.item_count = len(cart_items)
+        self.first_item_title = first_listing.title
+        self.first_item_image = first_image.image if first_image else None
+
     def calculate_total_price(self):
         """Calculates the total price from items, shipping fee, and applied credit."""
         subtotal = self.items.aggregate(
@@ -179,12 +235,14 @@ class Order(models.Model):
 
     def is_seller(self, user):
         """Check if a user is a seller for any item in this order."""
-        return self.items.filter(listing__seller=user).exists()
+        return self.seller_orders.filter(seller=user).exists()
 
 
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='items')
     listing = models.ForeignKey(Listing, on_delete=models.SET_NULL, null=True, related_name='order_items')
+    # Copied from the listing at checkout so it survives the listing's deletion.
+    seller = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='sold_items')
     product_title = models.CharField(max_length=200)
     quantity = models.PositiveIntegerField()
     price = models.DecimalField(max_digits=12, decimal_places=2)
@@ -194,4 +252,261 @@ class OrderItem(models.Model):
         return self.quantity * self.price
 
     def __str__(self):
-        return f"{self.quantity} x {self.product_title or '[Deleted Listing]'}"
\ No newline at end of file
+        return f"{self.quantity} x {self.product_title or '[Deleted Listing]'}"
+
+
+class SellerOrder(models.Model):
+    """
+    A seller's share of an order: one row per seller per order, written at
+    checkout. Seller pages and permission checks look orders up here instead
+    of joining OrderItem -> Listing -> seller.
+    """
+    seller = models.ForeignKey(User, on_delete=models.CASCADE, related_name='seller_orders')
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='seller_orders')
+    item_count = models.PositiveIntegerField()
+    subtotal = models.DecimalField(max_digits=12, decimal_places=2)
+    # Mirrors Order.status; update_order_status keeps them in step.
+    status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES, default='pending')
+    created_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('seller', 'order')
+        indexes = [models.Index(fields=['seller', '-created_at'])]
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Order #{self.order_id} for seller {self.seller_id}"
+
+    @classmethod
+    def for_items(cls, order, order_items):
+        """
+        Builds (unsaved) the rows for an order from its OrderItem instances.
+        """
+        rows = {}
+        for item in order_items:
+            if item.seller_id is None:
+                continue
+            row = rows.setdefault(item.seller_id, cls(
+                seller_id=item.seller_id, order=order, item_count=0, subtotal=0,
+                status=order.status, created_at=order.created_at,
+            ))
+            row.item_count += item.quantity
+            row.subtotal += item.total_price
+        return list(rows.values())
+
+class SellerStats(models.Model):
+    """
+    Running sales totals for a seller, kept up to date at checkout and on order
+    status changes (see sales_stats.py). Revenue and items sold exclude
+    cancelled orders.
+    """
+    seller = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='sales_stats')
+    pending_orders = models.IntegerField(default=0)
+    shipped_orders = models.IntegerField(default=0)
+    delivered_orders = models.IntegerField(default=0)
+    cancelled_orders = models.IntegerField(default=0)
+    items_sold = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name_plural = "Seller stats"
+
+    def __str__(self):
+        return f"Sales stats for {self.seller.username}"
+
+    @property
+    def total_orders(self):
+        return self.pending_orders + self.shipped_orders + self.delivered_orders + self.cancelled_orders
+
+
+class SellerDailySales(models.Model):
+    """A seller's sales per day the orders were placed, excluding cancelled orders."""
+    seller = models.ForeignKey(User, on_delete=models.CASCADE, related_name='daily_sales')
+    date = models.DateField()
+    orders = models.IntegerField(default=0)
+    items_sold = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = ('seller', 'date')
+        ordering = ['-date']
+        verbose_name_plural = "Seller daily sales"
+
+    def __str__(self):
+        return f"{self.seller.username} on {self.date}: {self.revenue}"
+
+
+class SellerListingSales(models.Model):
+    """A seller's sales per listing, excluding cancelled orders. Kept when the listing is deleted."""
+    seller = models.ForeignKey(User, on_delete=models.CASCADE, related_name='listing_sales')
+    listing = models.ForeignKey(Listing, on_delete=models.SET_NULL, null=True, related_name='+')
+    product_title = models.CharField(max_length=200)
+    items_sold = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = ('seller', 'listing')
+        indexes = [models.Index(fields=['seller', '-revenue'])]
+        verbose_name_plural = "Seller listing sales"
+
+    def __str__(self):
+        return f"{self.product_title or '[Deleted Listing]'}: {self.revenue}"
+
+
+class ListingDailyViews(models.Model):
+    """Detail page views of a listing per day, flushed from the view counter buffer."""
+    listing = models.ForeignKey(Listing, on_delete=models.CASCADE, related_name='daily_views')
+    date = models.DateField()
+    views = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('listing', 'date')
+        indexes = [models.Index(fields=['date'])]
+        ordering = ['-date']
+        verbose_name_plural = "Listing daily views"
+
+    def __str__(self):
+        return f"{self.listing_id} on {self.date}: {self.views}"
+
+
+class SimilarListings(models.Model):
+    """A listing's most similar available listings, best first, computed by listings/similar.py."""
+    listing = models.OneToOneField(Listing, on_delete=models.CASCADE, primary_key=True, related_name='similar')
+    neighbour_ids = models.JSONField(default=list)
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name_plural = "Similar listings"
+
+    def __str__(self):
+        return f"Similar to {self.listing_id}: {self.neighbour_ids}"
+
+
+class CoPurchase(models.Model):
+    """How many orders contained both `listing` and `other`. Stored in both directions."""
+    listing = models.ForeignKey(Listing, on_delete=models.CASCADE, related_name='+')
+    other = models.ForeignKey(Listing, on_delete=models.CASCADE, related_name='+')
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('listing', 'other')
+
+    def __str__(self):
+        return f"{self.listing_id} + {self.other_id}: {self.count}"
+
+
+class AlsoBought(models.Model):
+    """The listings most often bought with a listing, best first, computed by listings/copurchase.py."""
+    listing = models.OneToOneField(Listing, on_delete=models.CASCADE, primary_key=True, related_name='also_bought')
+    listing_ids = models.JSONField(default=list)
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name_plural = "Also bought"
+
+    def __str__(self):
+        return f"Bought with {self.listing_id}: {self.listing_ids}"
+
+
+class JobWatermark(models.Model):
+    """How far an incremental batch job has got, e.g. the last order it processed."""
+    job = models.CharField(max_length=50, primary_key=True)
+    position = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.job}: {self.position}"
+
+
+class RecentlyViewed(models.Model):
+    """A logged-in user's recently viewed listing ids, newest first, synced from their session."""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='recently_viewed')
+    listing_ids = models.JSONField(default=list)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = "Recently viewed"
+
+    def __str__(self):
+        return f"Recently viewed by {self.user_id}: {self.listing_ids}"
+
+
+class SavedSearch(models.Model):
+    """
+    A buyer's browse filter, matched against new and restocked listings by
+    listings/saved_searches.py. Fields mirror ListingFilter; blank means any.
+    """
+    # query_token is the longest word of the query, cut to this length, so the
+    # matcher can look searches up by the substrings of a listing's title.
+    TOKEN_LENGTH = 12
+    # Keeps get_absolute_url() short enough for a Notification link.
+    QUERY_MAX_LENGTH = 100
+    _WORD_RE = re.compile(r'\w+')
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='saved_searches')
+    query = models.CharField(max_length=QUERY_MAX_LENGTH, blank=True)
+    query_token = models.CharField(max_length=TOKEN_LENGTH, blank=True, editable=False, db_index=True)
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    city = models.CharField(max_length=120, blank=True)
+    condition = models.CharField(max_length=4, choices=Listing.CONDITION_CHOICES, blank=True)
+    min_price = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    max_price = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_matched_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [models.Index(fields=['category', 'city']), models.Index(fields=['min_price', 'max_price'])]
+        verbose_name_plural = "Saved searches"
+
+    def __str__(self):
+        parts = [f"'{self.query}'" if self.query else "Anything"]
+        if self.category_id:
+            parts.append(f"in {self.category.name}")
+        if self.city:
+            parts.append(f"in {self.city}")
+        if self.condition:
+            parts.append(self.get_condition_display().lower())
+        if self.min_price is not None or self.max_price is not None:
+            parts.append(f"₱{self.min_price or 0:,.0f}–{'' if self.max_price is None else f'₱{self.max_price:,.0f}'}")
+        return ' '.join(parts)
+
+    def save(self, *args, **kwargs):
+        words = self._WORD_RE.findall(self.query.lower())
+        self.query_token = max(words, key=len)[:self.TOKEN_LENGTH] if words else ''
+        super().save(*args, **kwargs)
+
+    def get_absolute_url(self):
+        """The browse page with this search's filters applied."""
+        params = {
+            'q': self.query, 'category': self.category.name if self.category_id else '', 'city': self.city,
+            'condition': self.condition, 'min_price': self.min_price, 'max_price': self.max_price,
+        }
+        return f"{reverse('listings:listing_list')}?{urlencode({k: v for k, v in params.items() if v not in ('', None)})}"
+
+    def matches(self, listing):
+        """Whether `listing` passes this search's filters, as ListingFilter would apply them."""
+        return (
+            (not self.query or self.query.lower() in listing.title.lower())
+            and (self.category_id is None or self.category_id == listing.category_id)
+            and (not self.city or self.city == listing.city)
+            and (not self.condition or self.condition == listing.condition)
+            and (self.min_price is None or listing.price >= self.min_price)
+            and (self.max_price is None or listing.price <= self.max_price)
+        )
+
+
+class ListingPriceChange(models.Model):
+    """One change of a listing's price. Only written when the price actually changes."""
+    listing = models.ForeignKey(Listing, on_delete=models.CASCADE, related_name='price_history')
+    old_price = models.DecimalField(max_digits=12, decimal_places=2)
+    new_price = models.DecimalField(max_digits=12, decimal_places=2)
+    changed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['changed_at', 'id']
+        indexes = [models.Index(fields=['listing', 'changed_at'])]
+
+    def __str__(self):
+        return f"{self.listing_id}: {self.old_price} -> {self.new_price}"
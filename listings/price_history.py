@@ -0,0 +1,164 @@
+# listings/price_history.py
+"""
+Listing price history and price-drop alerts for saved items.
+
+A ListingPriceChange row (old and new price) is appended only when a
+listing's price actually changes: by the pre/post_save signals for single
+edits and by record_price_changes() for bulk edits, which compares the
+prices read before the UPDATE with those after it. The price of a listing
+at any moment is the old price of its first change after that moment, or
+its current price if there is none, so nothing is written for listings
+whose price never moves.
+
+send_price_drop_alerts() reads the changes made since its watermark and,
+for the listings whose price went down over that window, finds the users
+who saved them while they cost more. Each user gets one notification for
+all their dropped items, written with one bulk insert in the same
+transaction as the watermark, so an interrupted run never alerts twice.
+"""
+from bisect import bisect_right
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.urls import reverse
+from django.utils import timezone
+
+from notifications.models import Notification
+
+from .models import JobWatermark, Listing, ListingPriceChange, SavedItem
+from .templatetags.listings_tags import philippine_currency
+
+WATERMARK_JOB = 'price_drops'
+# Changed listings per holder lookup, to keep the IN lists bounded.
+LISTING_CHUNK_SIZE = 500
+# Changes newer than this are left for the next run, so an edit still
+# committing with a lower id than a committed one isn't skipped.
+WATERMARK_LAG = timedelta(minutes=5)
+
+
+def record_price_changes(old_prices):
+    """
+    Appends a price change for each listing in `old_prices` ({pk: price
+    before an update}) whose price is now different.
+    """
+    if not old_prices:
+        return
+    now = timezone.now()
+    changes = [
+        ListingPriceChange(listing_id=pk, old_price=old_prices[pk], new_price=price, changed_at=now)
+        for pk, price in Listing.objects.filter(pk__in=old_prices).order_by().values_list('pk', 'price')
+        if price != old_prices[pk]
+    ]
+    ListingPriceChange.objects.bulk_create(changes, batch_size=500)
+
+
+def _price_history(listing_ids, since):
+    """
+    {listing_id: ([changed_at, ...], [old_price, ...])} of the changes after `since`, oldest first.
+    """
+    history = defaultdict(lambda: ([], []))
+    rows = ListingPriceChange.objects.filter(listing_id__in=listing_ids, changed_at__gt=since).order_by(
+        'listing_id', 'changed_at', 'pk'
+    ).values_list('listing_id', 'changed_at', 'old_price')
+    for listing_id, changed_at, old_price in rows:
+        moments, prices = history[listing_id]
+        moments.append(changed_at)
+        prices.append(old_price)
+    return history
+
+
+def _price_at(history, listing, moment):
+    moments, prices = history.get(listing.pk, ((), ()))
+    index = bisect_right(moments, moment)
+    return prices[index] if index < len(prices) else listing.price
+
+
+def _find_drops(windows, drops_by_user):
+    """
+    Adds (listing, price when saved) to drops_by_user[user_id] for every
+    holder of a listing in `windows` ({listing_id: (first change, price
+    before it, price after the last)}) whose price dropped since they saved it.
+    """
+    listings = {
+        listing.pk: listing
+        for listing in Listing.objects.filter(pk__in=windows, status='available').only(
+            'pk', 'title', 'price', 'seller_id'
+        )
+    }
+    # A listing whose price moved again after the window is left for the
+    # next run, which compares against the latest price.
+    dropped = {
+        pk: listing for pk, listing in listings.items()
+        if listing.price == windows[pk][2] and listing.price < windows[pk][1]
+    }
+    if not dropped:
+        return
+
+    holders = list(SavedItem.objects.filter(listing_id__in=dropped).values_list('user_id', 'listing_id', 'saved_at'))
+    if not holders:
+        return
+    history = _price_history(dropped, min(saved_at for _, _, saved_at in holders))
+
+    for user_id, listing_id, saved_at in holders:
+        listing = dropped[listing_id]
+        if user_id == listing.seller_id:
+            continue
+        first_change_at = windows[listing_id][0]
+        saved_price = _price_at(history, listing, saved_at)
+        # Holders who saved before the window were already told about any
+        # earlier drop, so the price must also be below its pre-window price.
+        if listing.price < saved_price and (saved_at >= first_change_at or listing.price < windows[listing_id][1]):
+            drops_by_user[user_id].append((listing, saved_price))
+
+
+def _message(drops):
+    if len(drops) == 1:
+        listing, saved_price = drops[0]
+        message = (
+            f"Price drop on '{listing.title}': now ₱{philippine_currency(listing.price)}, "
+            f"down from ₱{philippine_currency(saved_price)}"
+        )
+        link = listing.get_absolute_url()
+    else:
+        message = f"{len(drops)} items in your wishlist dropped in price"
+        link = reverse('accounts:saved_listings')
+    return message[:255], link
+
+
+def send_price_drop_alerts():
+    """
+    Notifies the holders of saved listings whose price dropped since the
+    last run. Returns the number of notifications sent.
+    """
+    watermark, _ = JobWatermark.objects.get_or_create(job=WATERMARK_JOB)
+    changes = ListingPriceChange.objects.filter(
+        pk__gt=watermark.position, changed_at__lt=timezone.now() - WATERMARK_LAG
+    ).order_by('pk').values_list('pk', 'listing_id', 'changed_at', 'old_price', 'new_price')
+
+    windows = {}
+    last_pk = None
+    for pk, listing_id, changed_at, old_price, new_price in changes:
+        first_change_at, price_before, _ = windows.get(listing_id, (changed_at, old_price, None))
+        windows[listing_id] = (first_change_at, price_before, new_price)
+        last_pk = pk
+    if last_pk is None:
+        return 0
+
+    drops_by_user = defaultdict(list)
+    listing_ids = list(windows)
+    for start in range(0, len(listing_ids), LISTING_CHUNK_SIZE):
+        chunk = listing_ids[start:start + LISTING_CHUNK_SIZE]
+        _find_drops({pk: windows[pk] for pk in chunk}, drops_by_user)
+
+    notifications = []
+    for user_id, drops in drops_by_user.items():
+        message, link = _message(drops)
+        notifications.append(Notification(
+            recipient_id=user_id, message=message, notification_type='price_drop', link=link
+        ))
+    with transaction.atomic():
+        Notification.objects.bulk_create(notifications, batch_size=500)
+        watermark.position = last_pk
+        watermark.save(update_fields=['position', 'updated_at'])
+    return len(notifications)
@@ -0,0 +1,80 @@
+# listings/recently_viewed.py
+"""
+Per-user "recently viewed" listings.
+
+The list lives in the session as a fixed-size array of listing ids, newest
+first: viewing a listing moves it to the front and the oldest id falls off
+the end. Sessions are saved on every request here (SESSION_SAVE_EVERY_REQUEST),
+so keeping the list there adds no write of its own, as long as the session
+already exists: visitors without one (crawlers, first page views) aren't
+tracked, since starting a session for them would insert a row and set a
+cookie on every detail view. For logged-in users the
+list is copied to RecentlyViewed at most every RECENTLY_VIEWED_SYNC_INTERVAL
+and at logout, and merged back into the session at login, so it follows them
+across devices.
+"""
+import time
+
+from .models import Listing, RecentlyViewed
+
+RECENTLY_VIEWED_SIZE = 12
+RECENTLY_VIEWED_SYNC_INTERVAL = 300
+
+SESSION_KEY = 'recently_viewed'
+SYNCED_AT_SESSION_KEY = 'recently_viewed_synced_at'
+
+
+def _push(listing_ids, listing_id):
+    """
+    Moves `listing_id` to the front of the list, keeping it within RECENTLY_VIEWED_SIZE.
+    """
+    return ([listing_id] + [pk for pk in listing_ids if pk != listing_id])[:RECENTLY_VIEWED_SIZE]
+
+
+def sync_recently_viewed(request):
+    """
+    Saves the session's list for the logged-in user.
+    """
+    RecentlyViewed.objects.update_or_create(
+        user=request.user, defaults={'listing_ids': request.session.get(SESSION_KEY, [])}
+    )
+    request.session[SYNCED_AT_SESSION_KEY] = time.time()
+
+
+def remember_view(request, listing):
+    """
+    Records a view of `listing` in the session, syncing to the database when due.
+    Does nothing for visitors who don't have a session yet.
+    """
+    if request.session.session_key is None:
+        return
+    request.session[SESSION_KEY] = _push(request.session.get(SESSION_KEY, []), listing.pk)
+    if request.user.is_authenticated:
+        synced_at = request.session.get(SYNCED_AT_SESSION_KEY, 0)
+        if time.time() - synced_at >= RECENTLY_VIEWED_SYNC_INTERVAL:
+            sync_recently_viewed(request)
+
+
+def restore_recently_viewed(request, user):
+    """
+    Merges the user's saved list after the views made in this session.
+    """
+    saved = RecentlyViewed.objects.filter(user=user).values_list('listing_ids', flat=True).first() or []
+    listing_ids = request.session.get(SESSION_KEY, [])
+    for listing_id in saved:
+        if listing_id not in listing_ids:
+            listing_ids = listing_ids + [listing_id]
+    request.session[SESSION_KEY] = listing_ids[:RECENTLY_VIEWED_SIZE]
+    request.session[SYNCED_AT_SESSION_KEY] = 0
+
+
+def recently_viewed_listings(request, exclude=None):
+    """
+    The available listings in the session's list, newest view first, fetched
+    with one in_bulk() query (plus images).
+    """
+    listing_ids = [pk for pk in request.session.get(SESSION_KEY, []) if pk != exclude]
+    if not listing_ids:
+        return []
+    listings = Listing.objects.filter(status='available').prefetch_related('images').in_bulk(listing_ids)
+    return [listings[pk] for pk in listing_ids if pk in listings]
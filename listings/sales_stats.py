@@ -0,0 +1,156 @@
+# listings/sales_stats.py
+"""
+Incremental maintenance of the seller sales tables (SellerStats,
+SellerDailySales, SellerListingSales).
+
+Checkout and order status changes apply deltas to the rows of the sellers
+involved, so the sales dashboard reads a handful of precomputed rows instead
+of aggregating every order a seller has ever had. rebuild_seller_stats()
+recomputes everything from the orders (backfills, admin edits).
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, Max, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import OrderItem, SellerStats, SellerDailySales, SellerListingSales
+
+CANCELLED = 'cancelled'
+
+
+def _status_field(status):
+    return f'{status}_orders'
+
+
+def _group_lines(lines):
+    """
+    Groups (seller_id, listing_id, product_title, quantity, price) tuples by seller.
+    """
+    by_seller = defaultdict(list)
+    for seller_id, listing_id, product_title, quantity, price in lines:
+        by_seller[seller_id].append((listing_id, product_title, quantity, quantity * price))
+    return by_seller
+
+
+def _apply(order, lines_by_seller, status_deltas, sign):
+    """
+    Applies one order's contribution to each of its sellers' rows.
+    `status_deltas` maps statuses to order-count changes; `sign` (+1, -1 or 0)
+    adds, removes or leaves the order's sales in the revenue tables.
+    """
+    now = timezone.now()
+    day = timezone.localdate(order.created_at)
+    for seller_id, lines in lines_by_seller.items():
+        items_sold = sum(quantity for _, _, quantity, _ in lines)
+        revenue = sum((amount for _, _, _, amount in lines), Decimal('0'))
+
+        updates = {
+            _status_field(status): F(_status_field(status)) + delta
+            for status, delta in status_deltas.items() if delta
+        }
+        if sign:
+            updates['items_sold'] = F('items_sold') + sign * items_sold
+            updates['revenue'] = F('revenue') + sign * revenue
+
+            daily, _ = SellerDailySales.objects.get_or_create(seller_id=seller_id, date=day)
+            SellerDailySales.objects.filter(pk=daily.pk).update(
+                orders=F('orders') + sign, items_sold=F('items_sold') + sign * items_sold,
+                revenue=F('revenue') + sign * revenue,
+            )
+            for listing_id, product_title, quantity, amount in lines:
+                if listing_id is None:
+                    # The listing was deleted; its row is kept as it was.
+                    continue
+                listing_sales, _ = SellerListingSales.objects.get_or_create(
+                    seller_id=seller_id, listing_id=listing_id, defaults={'product_title': product_title}
+                )
+                SellerListingSales.objects.filter(pk=listing_sales.pk).update(
+                    items_sold=F('items_sold') + sign * quantity, revenue=F('revenue') + sign * amount,
+                )
+
+        SellerStats.objects.get_or_create(seller_id=seller_id)
+        SellerStats.objects.filter(seller_id=seller_id).update(updated_at=now, **updates)
+
+
+def record_order_placed(order, order_items):
+    """
+    Adds a new order to its sellers' stats. `order_items` are the order's
+    OrderItem instances with their listings loaded, as built at checkout.
+    """
+    lines = [
+        (item.seller_id, item.listing_id, item.product_title, item.quantity, item.price)
+        for item in order_items if item.seller_id is not None
+    ]
+    _apply(order, _group_lines(lines), {order.status: 1}, 1)
+
+
+def record_status_change(order, old_status):
+    """
+    Moves an order between status counts for each of its sellers, and takes
+    it out of (or back into) their sales when it is cancelled (or restored).
+    """
+    if old_status == order.status:
+        return
+    if order.status == CANCELLED:
+        sign = -1
+    elif old_status == CANCELLED:
+        sign = 1
+    else:
+        sign = 0
+    lines = order.items.filter(seller__isnull=False).values_list(
+        'seller_id', 'listing_id', 'product_title', 'quantity', 'price'
+    )
+    _apply(order, _group_lines(lines), {old_status: -1, order.status: 1}, sign)
+
+
+@transaction.atomic
+def rebuild_seller_stats():
+    """
+    Recomputes every seller's stats from the order items. Per-listing rows are
+    only rebuilt for listings that still exist.
+    """
+    SellerStats.objects.all().delete()
+    SellerDailySales.objects.all().delete()
+    SellerListingSales.objects.all().delete()
+
+    items = OrderItem.objects.filter(seller__isnull=False).order_by()
+    line_total = Sum(F('quantity') * F('price'))
+    now = timezone.now()
+
+    stats = {}
+    status_counts = items.values('seller_id', 'order__status').annotate(
+        orders=Count('order', distinct=True)
+    )
+    for row in status_counts:
+        seller_stats = stats.setdefault(row['seller_id'], SellerStats(
+            seller_id=row['seller_id'], updated_at=now
+        ))
+        setattr(seller_stats, _status_field(row['order__status']), row['orders'])
+
+    sales = items.exclude(order__status=CANCELLED)
+    for row in sales.values('seller_id').annotate(items=Sum('quantity'), revenue=line_total):
+        stats[row['seller_id']].items_sold = row['items']
+        stats[row['seller_id']].revenue = row['revenue']
+    SellerStats.objects.bulk_create(stats.values())
+
+    daily = sales.annotate(date=TruncDate('order__created_at')).values('seller_id', 'date').annotate(
+        orders=Count('order', distinct=True), items=Sum('quantity'), revenue=line_total
+    )
+    SellerDailySales.objects.bulk_create(
+        SellerDailySales(seller_id=row['seller_id'], date=row['date'], orders=row['orders'],
+                         items_sold=row['items'], revenue=row['revenue'])
+        for row in daily
+    )
+
+    per_listing = sales.filter(listing__isnull=False).values('seller_id', 'listing_id').annotate(
+        title=Max('product_title'), items=Sum('quantity'), revenue=line_total
+    )
+    SellerListingSales.objects.bulk_create(
+        SellerListingSales(seller_id=row['seller_id'], listing_id=row['listing_id'],
+                           product_title=row['title'], items_sold=row['items'], revenue=row['revenue'])
+        for row in per_listing
+    )
+    return len(stats)
@@ -0,0 +1,39 @@
+# listings/saved.py
+"""
+Cached set of the listings a user has saved.
+
+Listing grids draw a heart on every card, filled when the listing is in the
+viewer's wishlist. The ids are read from the cache (one query on a miss),
+turned into a frozenset once per request, and the cache entry is dropped
+whenever one of the user's SavedItems is created or deleted (see
+listings/signals.py). Each card's check is then a set lookup.
+"""
+from django.core.cache import cache
+
+from .models import SavedItem
+
+SAVED_IDS_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def _cache_key(user_id):
+    return f'saved_listing_ids:{user_id}'
+
+
+def saved_listing_ids(user):
+    """
+    The ids of the listings `user` has saved, as a frozenset. Memoized on the
+    user object, so a request reads the cache at most once.
+    """
+    if not user.is_authenticated:
+        return frozenset()
+    if not hasattr(user, '_saved_listing_ids'):
+        listing_ids = cache.get(_cache_key(user.pk))
+        if listing_ids is None:
+            listing_ids = list(SavedItem.objects.filter(user=user).values_list('listing_id', flat=True))
+            cache.set(_cache_key(user.pk), listing_ids, SAVED_IDS_CACHE_TIMEOUT)
+        user._saved_listing_ids = frozenset(listing_ids)
+    return user._saved_listing_ids
+
+
+def invalidate_saved_listing_ids(user_id):
+    cache.delete(_cache_key(user_id))
@@ -0,0 +1,128 @@
+# listings/saved_searches.py
+"""
+Saved-search alerts.
+
+When listings are created or come back in stock, notify_saved_searches()
+finds the saved searches they match without running any search against the
+listings table. It looks up candidate searches by their indexed columns:
+  - category and city, each blank or equal to one of the batch's values;
+  - min_price and max_price, each blank or within the batch's price range;
+  - query_token, which must be blank or a substring of one of the batch's
+    title words.
+The second holds for every search whose query is a substring of the title.
+Candidates are bucketed by category in memory and checked exactly with
+SavedSearch.matches(). Each user gets at most one notification per batch,
+and they are written with one bulk insert.
+"""
+from collections import defaultdict
+from functools import partial
+
+from django.db import transaction
+from django.db.models import Q
+from django.urls import reverse
+from django.utils import timezone
+
+from notifications.models import Notification
+
+from .models import Listing, SavedSearch
+
+MAX_SAVED_SEARCHES = 20
+# Substrings per query; keeps the token lookups within database parameter limits.
+TOKEN_LOOKUP_CHUNK_SIZE = 500
+
+
+def _title_substrings(title):
+    """
+    Every substring of up to SavedSearch.TOKEN_LENGTH characters of each word in `title`.
+    """
+    substrings = set()
+    for word in SavedSearch._WORD_RE.findall(title.lower()):
+        for start in range(len(word)):
+            for end in range(start + 1, min(len(word), start + SavedSearch.TOKEN_LENGTH) + 1):
+                substrings.add(word[start:end])
+    return substrings
+
+
+def _candidate_searches(listings):
+    prices = [listing.price for listing in listings]
+    candidates = SavedSearch.objects.filter(
+        Q(category__isnull=True) | Q(category__in={listing.category_id for listing in listings}),
+        Q(city='') | Q(city__in={listing.city for listing in listings}),
+        Q(min_price__isnull=True) | Q(min_price__lte=max(prices)),
+        Q(max_price__isnull=True) | Q(max_price__gte=min(prices)),
+    ).select_related('category')
+
+    searches = list(candidates.filter(query_token=''))
+    substrings = sorted(set().union(*(_title_substrings(listing.title) for listing in listings)))
+    for start in range(0, len(substrings), TOKEN_LOOKUP_CHUNK_SIZE):
+        searches += candidates.filter(query_token__in=substrings[start:start + TOKEN_LOOKUP_CHUNK_SIZE])
+    return searches
+
+
+def _message(matches):
+    """
+    One notification per user: `matches` maps their saved searches to the listings that matched.
+    """
+    listings = {listing.pk: listing for matched in matches.values() for listing in matched}
+    search = max(matches, key=lambda saved_search: len(matches[saved_search]))
+    if len(listings) == 1:
+        listing = next(iter(listings.values()))
+        message = f"New listing for your saved search {search}: {listing.title}"
+        link = listing.get_absolute_url()
+    else:
+        if len(matches) > 1:
+            message = f"{len(listings)} new listings match your saved searches {search} and {len(matches) - 1} more"
+        else:
+            message = f"{len(listings)} new listings match your saved search {search}"
+        link = search.get_absolute_url()
+        if len(link) > Notification._meta.get_field('link').max_length:
+            link = reverse('listings:listing_list')
+    return message[:255], link
+
+
+def notify_saved_searches(listing_ids):
+    """
+    Notifies the owners of saved searches matching any of the given listings
+    that are available. Returns the number of notifications sent.
+    """
+    listings = list(Listing.objects.filter(pk__in=listing_ids, status='available', stock__gt=0).only(
+        'pk', 'title', 'category_id', 'city', 'condition', 'price', 'seller_id'
+    ))
+    if not listings:
+        return 0
+
+    by_category = defaultdict(list)
+    for search in _candidate_searches(listings):
+        by_category[search.category_id].append(search)
+
+    matches_by_user = defaultdict(lambda: defaultdict(list))
+    for listing in listings:
+        for search in by_category[listing.category_id] + by_category[None]:
+            if search.user_id != listing.seller_id and search.matches(listing):
+                matches_by_user[search.user_id][search].append(listing)
+    if not matches_by_user:
+        return 0
+
+    notifications = []
+    for user_id, matches in matches_by_user.items():
+        message, link = _message(matches)
+        notifications.append(Notification(
+            recipient_id=user_id, message=message, notification_type='saved_search_match', link=link
+        ))
+    with transaction.atomic():
+        Notification.objects.bulk_create(notifications)
+        SavedSearch.objects.filter(
+            pk__in=[search.pk for matches in matches_by_user.values() for search in matches]
+        ).update(last_matched_at=timezone.now())
+    return len(notifications)
+
+
+def notify_saved_searches_on_commit(listing_ids):
+    """
+    Matches the listings once the current transaction commits, so alerts
+    never point at listings that were rolled back. A failure is logged
+    rather than raised, as the listings are saved by then.
+    """
+    listing_ids = list(listing_ids)
+    if listing_ids:
+        transaction.on_commit(partial(notify_saved_searches, listing_ids), robust=True)
@@ -1,7 +1,13 @@
 # listings/signals.py
-from django.db.models.signals import post_save, pre_save
+from django.db.models.signals import post_save, pre_save, post_delete
+from django.contrib.auth.signals import user_logged_in, user_logged_out
+from django.db.models import F, OuterRef, Q, Subquery
 from django.dispatch import receiver
-from .models import Review, Listing
+from .models import Review, Listing, ListingImage, ListingPriceChange, Order, OrderItem, SavedItem
+from .recently_viewed import restore_recently_viewed, sync_recently_viewed
+from .saved import invalidate_saved_listing_ids
+from .saved_searches import notify_saved_searches_on_commit
+from django.utils import timezone
 from decimal import Decimal
 
 @receiver(post_save, sender=Review)
@@ -32,7 +38,94 @@ def auto_update_listing_status(sender, instance, **kwargs):
             # Case 2: Stock is depleted
             elif old_instance.stock > 0 and instance.stock == 0:
                 instance.status = 'sold'
+            # Picked up by notify_saved_searches_on_save below.
+            instance._restocked = (
+                (old_instance.stock == 0 or old_instance.status != 'available')
+                and instance.status == 'available' and instance.stock > 0
+            )
+            # Picked up by record_price_change below.
+            if old_instance.price != instance.price:
+                instance._old_price = old_instance.price
         except sender.DoesNotExist:
             # This can happen in rare cases, like a data migration.
             # We can safely ignore it.
-            pass
\ No newline at end of file
+            pass
+
+
+@receiver(post_save, sender=Listing)
+def notify_saved_searches_on_save(sender, instance, created, **kwargs):
+    """
+    New and restocked listings are matched against buyers' saved searches.
+    """
+    if created or getattr(instance, '_restocked', False):
+        notify_saved_searches_on_commit([instance.pk])
+
+
+@receiver(post_save, sender=Listing)
+def record_price_change(sender, instance, created, **kwargs):
+    """
+    Appends to the listing's price history when its price actually changed.
+    """
+    old_price = getattr(instance, '_old_price', None)
+    if old_price is not None:
+        ListingPriceChange.objects.create(listing=instance, old_price=old_price, new_price=instance.price)
+        del instance._old_price
+
+
+@receiver(post_save, sender=ListingImage)
+def fill_order_images_on_upload(sender, instance, update_fields=None, **kwargs):
+    """
+    Orders placed while their first listing's image was still uploading
+    were summarized without a picture; fill it in once the upload lands.
+    """
+    if not instance.image or (update_fields is not None and 'image' not in update_fields):
+        return
+    first_listing = OrderItem.objects.filter(order=OuterRef('pk')).order_by('pk').values('listing_id')[:1]
+    Order.objects.filter(
+        Q(first_item_image__isnull=True) | Q(first_item_image=''), items__listing_id=instance.listing_id,
+    ).annotate(first_listing=Subquery(first_listing)).filter(
+        first_listing=instance.listing_id
+    ).update(first_item_image=instance.image)
+
+
+@receiver([post_save, post_delete], sender=Review)
+@receiver([post_save, post_delete], sender=ListingImage)
+def touch_listing_on_related_change(sender, instance, **kwargs):
+    """
+    Reviews and images are rendered as part of the listing, so a change to
+    either bumps the listing's updated_at and invalidates its cached card.
+    """
+    if instance.listing_id:
+        Listing.objects.filter(pk=instance.listing_id).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=SavedItem)
+def track_saved_item_added(sender, instance, created, **kwargs):
+    """
+    Keeps the listing's save count and the user's cached saved ids current.
+    update() leaves updated_at alone, so cached cards stay valid.
+    """
+    if created:
+        Listing.objects.filter(pk=instance.listing_id).update(save_count=F('save_count') + 1)
+        invalidate_saved_listing_ids(instance.user_id)
+
+
+@receiver(post_delete, sender=SavedItem)
+def track_saved_item_removed(sender, instance, **kwargs):
+    Listing.objects.filter(pk=instance.listing_id, save_count__gt=0).update(save_count=F('save_count') - 1)
+    invalidate_saved_listing_ids(instance.user_id)
+
+
+@receiver(user_logged_in)
+def restore_recently_viewed_on_login(sender, request, user, **kwargs):
+    if request is not None and hasattr(request, 'session'):
+        restore_recently_viewed(request, user)
+
+
+@receiver(user_logged_out)
+def sync_recently_viewed_on_logout(sender, request, user, **kwargs):
+    """
+    The session is about to be flushed, so save the latest list first.
+    """
+    if request is not None and user is not None and hasattr(request, 'session'):
+        sync_recently_viewed(request)
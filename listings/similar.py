@@ -0,0 +1,183 @@
+# listings/similar.py
+"""
+Precomputed "similar listings" for the detail page.
+
+refresh_similar_listings() loads every available listing once and scores
+candidate pairs on title similarity (cosine of TF-IDF vectors over title
+tokens) plus bonuses for a shared category, price band and city. Each
+listing's best SIMILAR_LISTINGS_COUNT neighbours are stored as a list of ids
+in SimilarListings, so the detail page reads them with one primary-key
+lookup.
+
+Vectors are sparse dicts and candidates come from an inverted index of
+title tokens within the listing's top-level category. A listing is only
+compared with listings it shares a token with, plus a few in its category
+and price band, never with the whole catalogue.
+
+An incremental run recomputes listings that are new or changed since their
+list was computed, plus their new neighbours, so a new listing also shows up
+next to the listings it resembles. A full run (--full) recomputes every list.
+"""
+import heapq
+import math
+import re
+from collections import Counter, defaultdict, namedtuple
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Listing, SimilarListings
+
+SIMILAR_LISTINGS_COUNT = 8
+# Score = title cosine * TITLE + bonuses. A shared leaf category earns the
+# full CATEGORY bonus and a shared parent half of it; the same price band
+# earns PRICE and an adjacent band half of it.
+SIMILARITY_WEIGHTS = {'title': 0.6, 'category': 0.2, 'price': 0.1, 'city': 0.1}
+# Prices within the same power of this ratio share a band.
+PRICE_BAND_RATIO = 1.5
+# Tokens in more listings than this (per top-level category) are too common
+# to be worth walking for candidates; their weight is tiny anyway.
+MAX_POSTINGS = 2000
+# Listings in the same category and price band always considered, newest first.
+FALLBACK_CANDIDATES = 50
+WRITE_BATCH_SIZE = 500
+
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+_STOP_WORDS = frozenset({'a', 'an', 'and', 'for', 'in', 'of', 'on', 'or', 'the', 'to', 'with'})
+
+_Item = namedtuple('_Item', ['pk', 'category_id', 'group', 'band', 'city', 'vector'])
+
+
+def _tokens(title):
+    return [token for token in _TOKEN_RE.findall(title.lower()) if token not in _STOP_WORDS]
+
+
+def _price_band(price):
+    if price <= 0:
+        return None
+    return math.floor(math.log(float(price)) / math.log(PRICE_BAND_RATIO))
+
+
+class _Corpus:
+    """
+    TF-IDF vectors of the available listings' titles, indexed for
+    candidate lookups.
+    """
+
+    def __init__(self, rows):
+        token_counts = {}
+        document_frequency = Counter()
+        for pk, title, *_ in rows:
+            counts = Counter(_tokens(title))
+            token_counts[pk] = counts
+            document_frequency.update(counts.keys())
+
+        total = len(rows)
+        idf = {token: math.log((1 + total) / (1 + df)) + 1 for token, df in document_frequency.items()}
+
+        self.items = {}
+        self.updated_at = {}
+        self._postings = defaultdict(list)
+        self._by_band = defaultdict(list)
+        # Newest first, so the fallback candidates are the most recent listings.
+        for pk, title, category_id, parent_id, price, city, updated_at in sorted(rows, key=lambda row: row[6], reverse=True):
+            vector = {token: (1 + math.log(count)) * idf[token] for token, count in token_counts[pk].items()}
+            norm = math.sqrt(sum(weight * weight for weight in vector.values())) or 1.0
+            vector = {token: weight / norm for token, weight in vector.items()}
+
+            item = _Item(pk, category_id, parent_id or category_id, _price_band(price), city.strip().lower(), vector)
+            self.items[pk] = item
+            self.updated_at[pk] = updated_at
+            for token, weight in vector.items():
+                self._postings[(item.group, token)].append((pk, weight))
+            self._by_band[(category_id, item.band)].append(pk)
+
+    def _score(self, item, other, title_similarity):
+        score = SIMILARITY_WEIGHTS['title'] * title_similarity
+        if item.category_id == other.category_id:
+            score += SIMILARITY_WEIGHTS['category']
+        elif item.group == other.group:
+            score += SIMILARITY_WEIGHTS['category'] / 2
+        if item.band is not None and other.band is not None:
+            if item.band == other.band:
+                score += SIMILARITY_WEIGHTS['price']
+            elif abs(item.band - other.band) == 1:
+                score += SIMILARITY_WEIGHTS['price'] / 2
+        if item.city == other.city:
+            score += SIMILARITY_WEIGHTS['city']
+        return score
+
+    def neighbours(self, pk, count=SIMILAR_LISTINGS_COUNT):
+        """
+        The `count` best-scoring listings for `pk`, best first.
+        """
+        item = self.items[pk]
+        dot_products = defaultdict(float)
+        for token, weight in item.vector.items():
+            posting = self._postings[(item.group, token)]
+            if len(posting) > MAX_POSTINGS:
+                continue
+            for other_pk, other_weight in posting:
+                dot_products[other_pk] += weight * other_weight
+        for other_pk in self._by_band[(item.category_id, item.band)][:FALLBACK_CANDIDATES]:
+            dot_products.setdefault(other_pk, 0.0)
+        dot_products.pop(pk, None)
+
+        scored = (
+            (self._score(item, self.items[other_pk], similarity), other_pk)
+            for other_pk, similarity in dot_products.items()
+        )
+        return [other_pk for _, other_pk in heapq.nlargest(count, scored)]
+
+
+def _load_corpus():
+    rows = Listing.objects.filter(status='available').order_by().values_list(
+        'pk', 'title', 'category_id', 'category__parent_id', 'price', 'city', 'updated_at'
+    )
+    return _Corpus(list(rows))
+
+
+def refresh_similar_listings(full=False):
+    """
+    Recomputes the similar-listing lists of new and changed listings (or of
+    every available listing with `full`). Returns the number of lists written.
+    """
+    # Taken before loading, so a listing edited mid-run is picked up next time.
+    now = timezone.now()
+    corpus = _load_corpus()
+    if full:
+        targets = set(corpus.items)
+    else:
+        computed_at = dict(SimilarListings.objects.values_list('listing_id', 'computed_at'))
+        targets = {
+            pk for pk, updated_at in corpus.updated_at.items()
+            if pk not in computed_at or updated_at > computed_at[pk]
+        }
+
+    lists = {pk: corpus.neighbours(pk) for pk in targets}
+    if not full:
+        # The changed listings may now belong in their neighbours' lists too.
+        affected = {other_pk for neighbour_ids in lists.values() for other_pk in neighbour_ids} - targets
+        lists.update((pk, corpus.neighbours(pk)) for pk in affected)
+
+    rows = [SimilarListings(listing_id=pk, neighbour_ids=ids, computed_at=now) for pk, ids in lists.items()]
+    with transaction.atomic():
+        SimilarListings.objects.bulk_create(
+            rows, batch_size=WRITE_BATCH_SIZE, update_conflicts=True,
+            unique_fields=['listing'], update_fields=['neighbour_ids', 'computed_at'],
+        )
+    return len(rows)
+
+
+def similar_listings(listing):
+    """
+    The stored similar listings of `listing` that are still available, best first.
+    """
+    neighbour_ids = SimilarListings.objects.filter(listing_id=listing.pk).values_list(
+        'neighbour_ids', flat=True
+    ).first()
+    if not neighbour_ids:
+        return []
+    listings = Listing.objects.filter(pk__in=neighbour_ids, status='available').prefetch_related('images')
+    by_pk = {neighbour.pk: neighbour for neighbour in listings}
+    return [by_pk[pk] for pk in neighbour_ids if pk in by_pk]
@@ -1,7 +1,11 @@
 # listings/templatetags/listings_tags.py
 from django import template
+from django.forms.utils import flatatt
+from django.utils.html import format_html
 import locale
 
+from listings.images import IMAGE_VARIANTS, variant_url, variant_srcset
+
 register = template.Library()
 
 @register.filter(name='philippine_currency')
@@ -46,4 +50,30 @@ def order_status_badge(status):
         'delivered': 'success',
         'cancelled': 'danger',
     }
-    return status_map.get(status, 'secondary')
\ No newline at end of file
+    return status_map.get(status, 'secondary')
+
+
+@register.filter(name='image_variant')
+def image_variant(image, variant):
+    """
+    Returns the URL of a named size of a Cloudinary image.
+    Usage: {{ listing.images.first.image|image_variant:'thumb' }}
+    """
+    return variant_url(image, variant)
+
+
+@register.simple_tag
+def responsive_img(image, variant, **attrs):
+    """
+    Renders an <img> for a named image size with srcset/sizes, so browsers
+    pick the 1x or 2x candidate. Extra keyword arguments become attributes.
+    Usage: {% responsive_img image.image 'card' alt=listing.title class='listing-card-image' %}
+    """
+    src = variant_url(image, variant)
+    if not src:
+        return ''
+    attrs.setdefault('loading', 'lazy')
+    return format_html(
+        '<img src="{}" srcset="{}" sizes="{}"{}>',
+        src, variant_srcset(image, variant), IMAGE_VARIANTS[variant]['sizes'], flatatt(attrs)
+    )
@@ -0,0 +1,91 @@
+# listings/trending.py
+"""
+Trending ranking of listings.
+
+rank_trending_listings() scores every listing from its recent activity
+(views from the daily rollup, saves, cart adds and units ordered), each
+event weighted by kind and halved in value every TRENDING_HALF_LIFE_DAYS,
+and stores the result in Listing.trending_score. The browse page's
+"Trending" ordering sorts on that indexed column, so no activity is
+aggregated at request time. Run it periodically with the
+rank_trending_listings command.
+"""
+from collections import Counter
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import CartItem, Listing, ListingDailyViews, OrderItem, SavedItem
+
+TRENDING_WINDOW_DAYS = 14
+TRENDING_HALF_LIFE_DAYS = 3
+TRENDING_WEIGHTS = {
+    'views': 1,
+    'saves': 5,
+    'cart_adds': 10,
+    'units_ordered': 20,
+}
+
+
+def _daily_activity(since):
+    """
+    Yields (kind, listing_id, date, count) for each kind of activity per
+    listing per day since `since`, one grouped query per kind.
+    """
+    start = timezone.make_aware(datetime.combine(since, time.min))
+
+    views = ListingDailyViews.objects.filter(date__gte=since).values_list('listing_id', 'date', 'views')
+    saves = SavedItem.objects.filter(saved_at__gte=start).annotate(
+        day=TruncDate('saved_at')
+    ).values('listing_id', 'day').annotate(count=Count('id')).values_list('listing_id', 'day', 'count')
+    cart_adds = CartItem.objects.filter(added_at__gte=start).annotate(
+        day=TruncDate('added_at')
+    ).values('listing_id', 'day').annotate(count=Count('id')).values_list('listing_id', 'day', 'count')
+    units_ordered = OrderItem.objects.filter(
+        listing__isnull=False, order__created_at__gte=start
+    ).exclude(order__status='cancelled').annotate(
+        day=TruncDate('order__created_at')
+    ).values('listing_id', 'day').annotate(count=Sum('quantity')).values_list('listing_id', 'day', 'count')
+
+    for kind, rows in (('views', views), ('saves', saves), ('cart_adds', cart_adds),
+                       ('units_ordered', units_ordered)):
+        for listing_id, day, count in rows.order_by():
+            yield kind, listing_id, day, count
+
+
+def compute_trending_scores(today=None):
+    """
+    Returns {listing_id: score} for listings with activity in the window.
+    """
+    today = today or timezone.localdate()
+    since = today - timedelta(days=TRENDING_WINDOW_DAYS - 1)
+    scores = Counter()
+    for kind, listing_id, day, count in _daily_activity(since):
+        decay = 0.5 ** ((today - day).days / TRENDING_HALF_LIFE_DAYS)
+        scores[listing_id] += TRENDING_WEIGHTS[kind] * count * decay
+    return {listing_id: round(score, 4) for listing_id, score in scores.items()}
+
+
+@transaction.atomic
+def rank_trending_listings(today=None):
+    """
+    Recomputes Listing.trending_score, writing only the scores that changed.
+    Returns the number of listings updated. updated_at is left alone so the
+    cached listing pages aren't invalidated by a re-rank.
+    """
+    scores = compute_trending_scores(today)
+    current = dict(Listing.objects.filter(trending_score__gt=0).order_by().values_list('pk', 'trending_score'))
+    existing = set(Listing.objects.filter(pk__in=scores).order_by().values_list('pk', flat=True))
+
+    stale = [pk for pk in current if pk not in scores]
+    Listing.objects.filter(pk__in=stale).update(trending_score=0)
+
+    changed = [
+        Listing(pk=pk, trending_score=score)
+        for pk, score in scores.items() if pk in existing and current.get(pk, 0) != score
+    ]
+    Listing.objects.bulk_update(changed, ['trending_score'], batch_size=500)
+    return len(stale) + len(changed)
@@ -0,0 +1,166 @@
+# listings/uploads.py
+"""
+Background image uploads.
+
+Request handlers stage uploaded files to local disk and save the row as
+'pending'; once the surrounding transaction commits, a worker pool pushes the
+staged files to the image host and fills in the CloudinaryField. Used for
+listing images and message attachments.
+
+Until a row is uploaded it has no image, so templates show a "Processing
+image" placeholder for it. The staging directory is only as durable as the
+disk under it: a staged file lost to a restart on ephemeral storage can't be
+recovered by retry_image_uploads, which reports it as missing.
+"""
+import logging
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+import cloudinary.uploader
+from cloudinary import CloudinaryResource
+from django.apps import apps
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_PENDING = 'pending'
+UPLOAD_DONE = 'done'
+UPLOAD_FAILED = 'failed'
+UPLOAD_STATUS_CHOICES = (
+    (UPLOAD_PENDING, 'Pending'),
+    (UPLOAD_DONE, 'Done'),
+    (UPLOAD_FAILED, 'Failed'),
+)
+
+
+class CloudinaryUploadBackend:
+    """
+    Uploads a staged file to Cloudinary and returns the stored resource.
+    """
+
+    def upload(self, path):
+        result = cloudinary.uploader.upload(path, resource_type='image')
+        return CloudinaryResource(
+            result['public_id'],
+            version=result.get('version'),
+            format=result.get('format'),
+            type=result.get('type', 'upload'),
+            resource_type=result.get('resource_type', 'image'),
+        )
+
+
+class FakeUploadBackend:
+    """
+    In-memory stand-in for tests. Records every upload and can be told to
+    fail a number of times to exercise the retry path.
+    """
+    uploaded = []
+    fail_times = 0
+
+    def upload(self, path):
+        if FakeUploadBackend.fail_times > 0:
+            FakeUploadBackend.fail_times -= 1
+            raise ConnectionError("Simulated upload failure.")
+        name, extension = os.path.splitext(os.path.basename(path))
+        FakeUploadBackend.uploaded.append(path)
+        return CloudinaryResource(
+            f"fake/{name}", version='1', format=extension.lstrip('.') or None,
+            type='upload', resource_type='image'
+        )
+
+
+@lru_cache(maxsize=1)
+def get_upload_backend():
+    return import_string(settings.IMAGE_UPLOAD_BACKEND)()
+
+
+@lru_cache(maxsize=1)
+def _get_executor():
+    return ThreadPoolExecutor(max_workers=settings.IMAGE_UPLOAD_WORKERS, thread_name_prefix='image-upload')
+
+
+def stage_upload(uploaded_file):
+    """
+    Writes an UploadedFile to the staging directory and returns its path.
+    """
+    os.makedirs(settings.UPLOAD_STAGING_DIR, exist_ok=True)
+    extension = os.path.splitext(uploaded_file.name)[1].lower()
+    path = os.path.join(settings.UPLOAD_STAGING_DIR, f"{uuid.uuid4().hex}{extension}")
+    with open(path, 'wb') as destination:
+        for chunk in uploaded_file.chunks():
+            destination.write(chunk)
+    return path
+
+
+def process_upload(model_label, pk, field_name='image'):
+    """
+    Uploads the staged file of one pending row, retrying with exponential
+    backoff, and records the outcome on the row.
+    """
+    model = apps.get_model(model_label)
+    try:
+        instance = model.objects.get(pk=pk)
+    except model.DoesNotExist:
+        # The row was deleted while queued; nothing references the file anymore.
+        return
+    if instance.upload_status == UPLOAD_DONE or not instance.staged_path:
+        return
+
+    backend = get_upload_backend()
+    attempts = settings.IMAGE_UPLOAD_RETRIES + 1
+    for attempt in range(attempts):
+        try:
+            resource = backend.upload(instance.staged_path)
+            break
+        except Exception:
+            logger.warning("Upload of %s #%s failed (attempt %s/%s).", model_label, pk, attempt + 1, attempts,
+                           exc_info=True)
+            if attempt + 1 < attempts:
+                time.sleep(settings.IMAGE_UPLOAD_RETRY_DELAY * 2 ** attempt)
+    else:
+        instance.upload_status = UPLOAD_FAILED
+        instance.save(update_fields=['upload_status'])
+        return
+
+    staged_path = instance.staged_path
+    setattr(instance, field_name, resource)
+    instance.upload_status = UPLOAD_DONE
+    instance.staged_path = ''
+    instance.save(update_fields=[field_name, 'upload_status', 'staged_path'])
+    try:
+        os.remove(staged_path)
+    except OSError:
+        # Already gone, or a remote URL (bulk imports).
+        pass
+
+
+def _run_upload(model_label, pk, field_name):
+    try:
+        process_upload(model_label, pk, field_name)
+    except Exception:
+        logger.exception("Unexpected error uploading %s #%s.", model_label, pk)
+    finally:
+        close_old_connections()
+
+
+def enqueue_uploads(instances, field_name='image'):
+    """
+    Queues the staged files of the given rows once the current transaction
+    commits. Each row is a separate task, so a listing's images upload in
+    parallel. With IMAGE_UPLOAD_WORKERS = 0 uploads run inline (tests).
+    """
+    jobs = [(instance._meta.label, instance.pk) for instance in instances]
+
+    def submit():
+        for model_label, pk in jobs:
+            if settings.IMAGE_UPLOAD_WORKERS:
+                _get_executor().submit(_run_upload, model_label, pk, field_name)
+            else:
+                process_upload(model_label, pk, field_name)
+
+    transaction.on_commit(submit)
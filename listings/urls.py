@@ -7,10 +7,12 @@ app_name = 'listings'
 urlpatterns = [
     path('', views.ListingListView.as_view(), name='listing_list'),
     path('listing/create/', views.ListingCreateView.as_view(), name='listing_create'),
+    path('listing/import/', views.import_listings_view, name='listing_import'),
     path('listing/<int:pk>/', views.ListingDetailView.as_view(), name='listing_detail'),
     path('listing/<int:pk>/update/', views.ListingUpdateView.as_view(), name='listing_update'),
     path('listing/<int:pk>/delete/', views.ListingDeleteView.as_view(), name='listing_delete'),
     path('listing/<int:pk>/sold/', views.mark_listing_as_sold, name='mark_listing_as_sold'),
+    path('listing/bulk-update/', views.bulk_update_listings_view, name='bulk_update_listings'),
     path('add-to-cart/<int:pk>/', views.add_to_cart, name='add_to_cart'),
     path('update_cart_item/<int:pk>/', views.update_cart_item, name='update_cart_item'),
     path('remove-from-cart/<int:pk>/', views.remove_from_cart, name='remove_from_cart'),
@@ -21,4 +23,6 @@ urlpatterns = [
     path('invoice/<int:pk>/', views.view_invoice, name='view_invoice'),
     path('saved/remove/<int:pk>/', views.remove_from_saved, name='remove_from_saved'),
     path('toggle_save/<int:pk>/', views.toggle_save_listing, name='toggle_save'),
+    path('saved-searches/add/', views.save_search, name='save_search'),
+    path('saved-searches/<int:pk>/delete/', views.delete_saved_search, name='delete_saved_search'),
 ]
\ No newline at end of file
@@ -0,0 +1,200 @@
+# listings/view_counts.py
+"""
+Buffered listing view counters.
+
+A detail page view only increments a counter in a buffer keyed by day and
+listing. At most every VIEW_COUNT_FLUSH_INTERVAL seconds the buffer is
+drained and the summed deltas are written with one UPDATE per table (per
+chunk of listings), so a popular listing costs one row write per interval
+rather than one per view. The buffer is process memory by default; with
+Redis configured it is a shared hash, drained atomically by whichever
+worker wins the flush lock.
+
+The memory buffer only exists in the web process that counted the views, so
+it's flushed by that process's own requests, never by the flush_view_counts
+command, and whatever is unflushed when the process restarts is lost. Use
+Redis wherever that matters.
+"""
+import logging
+import threading
+import time
+from collections import Counter
+from datetime import date
+from functools import lru_cache
+
+import redis
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Listing, ListingDailyViews
+
+logger = logging.getLogger(__name__)
+
+# Listings per UPDATE statement, to keep the CASE expressions bounded.
+FLUSH_CHUNK_SIZE = 500
+
+
+class MemoryViewCountBackend:
+    """
+    Counts in a Counter guarded by a lock. Each process flushes its own
+    counts, which is enough for a single-node deployment.
+    """
+    # Whether another process (e.g. the flush_view_counts command) can drain the buffer.
+    shared = False
+
+    def __init__(self):
+        self._counts = Counter()
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+    def increment(self, day, listing_id):
+        with self._lock:
+            self._counts[(day, listing_id)] += 1
+
+    def claim_flush(self, interval):
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_flush < interval:
+                return False
+            self._last_flush = now
+            return True
+
+    def drain(self):
+        with self._lock:
+            counts, self._counts = self._counts, Counter()
+        return counts
+
+    def restore(self, counts):
+        with self._lock:
+            self._counts.update(counts)
+
+
+# Read and delete the pending hash in one step, so views counted while a
+# flush is writing land in the next flush instead of being lost.
+_DRAIN_SCRIPT = """
+local counts = redis.call('HGETALL', KEYS[1])
+redis.call('DEL', KEYS[1])
+return counts
+"""
+
+
+class RedisViewCountBackend:
+    """
+    Counts in a Redis hash with 'YYYY-MM-DD:listing_id' fields. Errors are
+    logged and the views dropped: a lost count isn't worth a failed page.
+    """
+    shared = True
+    pending_key = 'viewcounts:pending'
+    lock_key = 'viewcounts:flush-lock'
+
+    def __init__(self):
+        self._client = redis.Redis.from_url(settings.VIEW_COUNT_REDIS_URL)
+        self._drain = self._client.register_script(_DRAIN_SCRIPT)
+
+    def increment(self, day, listing_id):
+        try:
+            self._client.hincrby(self.pending_key, f"{day.isoformat()}:{listing_id}", 1)
+        except redis.RedisError:
+            logger.warning("Couldn't count a view of listing %s.", listing_id, exc_info=True)
+
+    def claim_flush(self, interval):
+        try:
+            return bool(self._client.set(self.lock_key, 1, nx=True, ex=max(1, int(interval))))
+        except redis.RedisError:
+            return False
+
+    def drain(self):
+        counts = Counter()
+        try:
+            values = self._drain(keys=[self.pending_key])
+        except redis.RedisError:
+            logger.warning("Couldn't read the buffered view counts.", exc_info=True)
+            return counts
+        for field, count in zip(values[::2], values[1::2]):
+            day, listing_id = field.decode().split(':')
+            counts[(date.fromisoformat(day), int(listing_id))] = int(count)
+        return counts
+
+    def restore(self, counts):
+        pipe = self._client.pipeline()
+        for (day, listing_id), count in counts.items():
+            pipe.hincrby(self.pending_key, f"{day.isoformat()}:{listing_id}", count)
+        try:
+            pipe.execute()
+        except redis.RedisError:
+            logger.warning("Couldn't put back %s unflushed listing view counts; they are lost.", len(counts),
+                           exc_info=True)
+
+
+@lru_cache(maxsize=1)
+def get_view_count_backend():
+    return import_string(settings.VIEW_COUNT_BACKEND)()
+
+
+def _add_counts(queryset, key_field, deltas, target):
+    """
+    Adds deltas[key] to `target` on each row of `queryset` whose `key_field`
+    is key, in one UPDATE per chunk.
+    """
+    keys = list(deltas)
+    for start in range(0, len(keys), FLUSH_CHUNK_SIZE):
+        chunk = keys[start:start + FLUSH_CHUNK_SIZE]
+        increment = Case(
+            *[When(**{key_field: key}, then=Value(deltas[key])) for key in chunk],
+            default=Value(0), output_field=IntegerField(),
+        )
+        queryset.filter(**{f'{key_field}__in': chunk}).update(**{target: F(target) + increment})
+
+
+def _write_counts(counts):
+    listing_ids = {listing_id for _, listing_id in counts}
+    # Views of listings deleted since they were counted are dropped.
+    existing = set(Listing.objects.filter(pk__in=listing_ids).order_by().values_list('pk', flat=True))
+
+    totals = Counter()
+    by_day = {}
+    for (day, listing_id), count in counts.items():
+        if listing_id in existing:
+            totals[listing_id] += count
+            by_day.setdefault(day, {})[listing_id] = count
+
+    with transaction.atomic():
+        _add_counts(Listing.objects.all(), 'pk', totals, 'view_count')
+        for day, deltas in by_day.items():
+            ListingDailyViews.objects.bulk_create(
+                [ListingDailyViews(listing_id=listing_id, date=day) for listing_id in deltas],
+                ignore_conflicts=True,
+            )
+            _add_counts(ListingDailyViews.objects.filter(date=day), 'listing_id', deltas, 'views')
+    return sum(totals.values())
+
+
+def flush_view_counts():
+    """
+    Writes the buffered views to Listing.view_count and ListingDailyViews.
+    Returns the number of views written. On a database error the counts go
+    back into the buffer for the next flush.
+    """
+    backend = get_view_count_backend()
+    counts = backend.drain()
+    if not counts:
+        return 0
+    try:
+        return _write_counts(counts)
+    except DatabaseError:
+        logger.exception("Couldn't flush %s listing view counts; keeping them for the next flush.", len(counts))
+        backend.restore(counts)
+        return 0
+
+
+def record_view(listing):
+    """
+    Counts one view of `listing`, flushing the buffer when it's due.
+    """
+    backend = get_view_count_backend()
+    backend.increment(timezone.localdate(), listing.pk)
+    if backend.claim_flush(settings.VIEW_COUNT_FLUSH_INTERVAL):
+        flush_view_counts()
@@ -1,5 +1,7 @@
 # listings/views.py
+import csv
 import decimal
+import io
 from django.shortcuts import render, redirect, get_object_or_404
 from django.template.loader import render_to_string
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
@@ -10,10 +12,32 @@ from django.http import JsonResponse, HttpResponseForbidden, Http404
 from django.urls import reverse_lazy, reverse
 from django.contrib import messages
 from django.db.models import F, Avg
-
+from django.utils import timezone
+from django.utils.decorators import method_decorator
+from django.utils.http import url_has_allowed_host_and_scheme
+from django.views.decorators.http import condition
+
+from marketplace.ratelimit import rate_limit
+
+from .conditional import (
+    listing_detail_etag, listing_detail_last_modified, filter_listings_etag, search_suggestions_etag
+)
+from .bulk import bulk_update_listings
+from .copurchase import also_bought
 from .filters import ListingFilter
-from .models import Listing, ListingImage, SavedItem, Review, Cart, CartItem, Order, OrderItem, Category
-from .forms import ListingForm, ReviewForm, OrderForm
+from .imports import IMPORT_COLUMNS, import_listings
+from .images import variant_url
+from .uploads import stage_upload, enqueue_uploads, UPLOAD_PENDING
+from .sales_stats import record_order_placed
+from .recently_viewed import recently_viewed_listings, remember_view
+from .saved import saved_listing_ids
+from .saved_searches import MAX_SAVED_SEARCHES
+from .similar import similar_listings
+from .view_counts import record_view
+from .models import (
+    Listing, ListingImage, SavedItem, Review, Cart, CartItem, Order, OrderItem, Category, SellerOrder, SavedSearch,
+)
+from .forms import ListingForm, ReviewForm, OrderForm, BulkListingUpdateForm
 
 from messaging.models import Conversation, Message
 from notifications.models import Notification
@@ -69,16 +93,15 @@ class ListingListView(ListView):
             page_title = f"Deals in {city_name.title()}"
 
         context['page_title'] = page_title
+        context['recently_viewed'] = recently_viewed_listings(self.request)
 
-        if self.request.user.is_authenticated:
-            context['saved_listing_ids'] = SavedItem.objects.filter(
-                user=self.request.user
-            ).values_list('listing__id', flat=True)
-        else:
-            context['saved_listing_ids'] = []
+        context['saved_listing_ids'] = saved_listing_ids(self.request.user)
         return context
 
 
+@method_decorator(
+    condition(etag_func=listing_detail_etag, last_modified_func=listing_detail_last_modified), name='get'
+)
 class ListingDetailView(DetailView):
     """
     View for a single listing, including its details and reviews.
@@ -103,13 +126,17 @@ class ListingDetailView(DetailView):
         """
         context = super().get_context_data(**kwargs)
         context['reviews'] = self.object.reviews.all()
+        # Images still uploading have no file yet; the gallery skips them.
+        images = list(self.object.images.all())
+        context['gallery_images'] = [image for image in images if image.image]
+        context['images_pending'] = len(context['gallery_images']) < len(images)
         context['review_form'] = ReviewForm()
 
         can_review_items = []
 
         if self.request.user.is_authenticated:
             context['has_reviewed'] = self.object.reviews.filter(author=self.request.user).exists()
-            context['is_saved'] = SavedItem.objects.filter(listing=self.object, user=self.request.user).exists()
+            context['is_saved'] = self.object.pk in saved_listing_ids(self.request.user)
 
             # Find delivered order items for this listing that have not been reviewed
             can_review_items = OrderItem.objects.filter(
@@ -128,8 +155,25 @@ class ListingDetailView(DetailView):
 
         # Use the centralized method from the profile model
         context['seller_average_rating'] = self.object.seller.profile.get_seller_average_rating()
+        context['similar_listings'] = similar_listings(self.object)
         return context
 
+    def dispatch(self, request, *args, **kwargs):
+        """
+        Views are counted and remembered here rather than in get(), which
+        @condition skips when it answers a repeat visit with a 304.
+        """
+        response = super().dispatch(request, *args, **kwargs)
+        if request.method == 'GET' and response.status_code in (200, 304):
+            # A 304 never loads the listing; only anonymous visitors get one,
+            # and they can't be its seller.
+            listing = getattr(self, 'object', None) or Listing(pk=kwargs['pk'])
+            # Counted through a buffer; see listings/view_counts.py.
+            if listing.seller_id is None or listing.seller_id != request.user.pk:
+                record_view(listing)
+            remember_view(request, listing)
+        return response
+
     def post(self, request, *args, **kwargs):
         """
         Handles the creation of a new review for the listing.
@@ -209,17 +253,19 @@ class ListingCreateView(LoginRequiredMixin, CreateView):
 
     def form_valid(self, form):
         """
-        Saves the new listing and associated images.
+        Saves the new listing and queues its images for background upload.
         """
+        staged_paths = [stage_upload(image) for image in self.request.FILES.getlist('images')]
         with transaction.atomic():
             form.instance.seller = self.request.user
             self.object = form.save()
 
-            images = self.request.FILES.getlist('images')
-            if images:
-                ListingImage.objects.bulk_create([
-                    ListingImage(listing=self.object, image=image) for image in images
+            if staged_paths:
+                listing_images = ListingImage.objects.bulk_create([
+                    ListingImage(listing=self.object, staged_path=path, upload_status=UPLOAD_PENDING)
+                    for path in staged_paths
                 ])
+                enqueue_uploads(listing_images)
 
         messages.success(self.request, 'Your listing has been created successfully!')
         return super().form_valid(form)
@@ -241,19 +287,22 @@ class ListingUpdateView(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
 
     def form_valid(self, form):
         """
-        Saves updated listing details and handles image updates.
+        Saves updated listing details, deletes removed images and queues new
+        ones for background upload.
         """
+        staged_paths = [stage_upload(image) for image in self.request.FILES.getlist('images')]
         with transaction.atomic():
             self.object = form.save()
             images_to_delete = self.request.POST.getlist('images_to_delete')
             if images_to_delete:
                 ListingImage.objects.filter(pk__in=images_to_delete).delete()
 
-            new_images = self.request.FILES.getlist('images')
-            if new_images:
-                ListingImage.objects.bulk_create([
-                    ListingImage(listing=self.object, image=image) for image in new_images
+            if staged_paths:
+                listing_images = ListingImage.objects.bulk_create([
+                    ListingImage(listing=self.object, staged_path=path, upload_status=UPLOAD_PENDING)
+                    for path in staged_paths
                 ])
+                enqueue_uploads(listing_images)
 
         messages.success(self.request, 'Your listing has been updated successfully!')
         return redirect(self.get_success_url())
@@ -282,6 +331,7 @@ class ListingDeleteView(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
 
 
 @login_required
+@rate_limit('toggle_save_listing')
 def toggle_save_listing(request, pk):
     """
     Toggles saving/unsaving a listing to a user's wishlist via AJAX.
@@ -298,6 +348,8 @@ def toggle_save_listing(request, pk):
     return JsonResponse({'error': 'Invalid request method.'}, status=400)
 
 
+@rate_limit('filter_listings')
+@condition(etag_func=filter_listings_etag)
 def filter_listings(request):
     """
     Filters listings and returns the HTML for the listings grid via AJAX.
@@ -305,20 +357,45 @@ def filter_listings(request):
     filter_queryset = Listing.objects.all().select_related('seller').with_avg_rating()
     listing_filter = ListingFilter(request.GET, queryset=filter_queryset)
 
-    saved_listing_ids = []
-    if request.user.is_authenticated:
-        saved_listing_ids = SavedItem.objects.filter(user=request.user).values_list('listing__id', flat=True)
-
     context = {
         'filter': listing_filter,
         'listings': listing_filter.qs,
-        'saved_listing_ids': saved_listing_ids,
+        'saved_listing_ids': saved_listing_ids(request.user),
         'user': request.user
     }
     html = render_to_string('listings/partials/listings_grid.html', context)
     return JsonResponse({'html': html})
 
 
+@login_required
+def import_listings_view(request):
+    """
+    Creates listings in bulk from an uploaded CSV file and reports rows that failed.
+    """
+    result = None
+    if request.method == 'POST':
+        csv_upload = request.FILES.get('csv_file')
+        if not csv_upload:
+            messages.error(request, "Please choose a CSV file to import.")
+        else:
+            csv_file = io.TextIOWrapper(csv_upload.file, encoding='utf-8-sig', newline='')
+            try:
+                result = import_listings(request.user, csv_file)
+            except (UnicodeDecodeError, csv.Error):
+                messages.error(request, "The file could not be read as a UTF-8 CSV file.")
+            else:
+                if result.created:
+                    messages.success(request, f"Imported {result.created} listings.")
+                if result.error_count:
+                    messages.warning(request, f"{result.error_count} rows could not be imported.")
+
+    context = {
+        'result': result,
+        'columns': IMPORT_COLUMNS,
+    }
+    return render(request, 'listings/listing_import.html', context)
+
+
 @login_required
 def mark_listing_as_sold(request, pk):
     """
@@ -326,14 +403,39 @@ def mark_listing_as_sold(request, pk):
     """
     listing = get_object_or_404(Listing, pk=pk, seller=request.user)
     if request.method == 'POST':
-        with transaction.atomic():
-            listing.status = 'sold'
-            listing.stock = 0
-            listing.save()
+        bulk_update_listings(Listing.objects.filter(pk=listing.pk), stock_mode='set', stock_value=0, status='sold')
         messages.success(request, f"Listing '{listing.title}' has been marked as sold.")
     return redirect('accounts:dashboard')
 
 
+@login_required
+def bulk_update_listings_view(request):
+    """
+    Applies one price/stock/status change to the listings selected on the dashboard.
+    """
+    if request.method != 'POST':
+        return redirect('accounts:dashboard')
+
+    form = BulkListingUpdateForm(request.POST, seller=request.user)
+    if form.is_valid():
+        data = form.cleaned_data
+        updated = bulk_update_listings(
+            Listing.objects.filter(seller=request.user, pk__in=[listing.pk for listing in data['listings']]),
+            price_mode=data['price_mode'], price_value=data['price_value'],
+            stock_mode=data['stock_mode'], stock_value=data['stock_value'],
+            status=data['status'],
+        )
+        messages.success(request, f"Updated {updated} listing{'s' if updated != 1 else ''}.")
+    else:
+        for errors in form.errors.values():
+            for error in errors:
+                messages.error(request, error)
+    next_url = request.POST.get('next')
+    if next_url and url_has_allowed_host_and_scheme(next_url, allowed_hosts={request.get_host()}):
+        return redirect(next_url)
+    return redirect('accounts:dashboard')
+
+
 @login_required
 def add_to_cart(request, pk):
     """
@@ -382,7 +484,8 @@ def view_cart(request):
         'subtotal': subtotal,
         'shipping_fee': shipping_fee,
         'grand_total': grand_total,
-        'cart': cart
+        'cart': cart,
+        'also_bought': also_bought([item.listing_id for item in cart_items], exclude_seller=request.user),
     }
     return render(request, 'listings/cart_detail.html', context)
 
@@ -398,6 +501,53 @@ def remove_from_cart(request, pk):
     return redirect('listings:view_cart')
 
 
+@login_required
+def save_search(request):
+    """
+    Saves the browse page's current filters as a search to be alerted about.
+    """
+    if request.method != 'POST':
+        return redirect('listings:listing_list')
+
+    listing_filter = ListingFilter(request.POST)
+    if not listing_filter.form.is_valid():
+        messages.error(request, "Those filters couldn't be saved. Please check them and try again.")
+        return redirect('listings:listing_list')
+
+    data = listing_filter.form.cleaned_data
+    criteria = {
+        'query': (data.get('q') or '').strip(),
+        'category': Category.objects.filter(name=data['category']).first() if data.get('category') else None,
+        'city': data.get('city') or '',
+        'condition': data.get('condition') or '',
+        'min_price': data.get('min_price'),
+        'max_price': data.get('max_price'),
+    }
+    if not any(value not in ('', None) for value in criteria.values()):
+        messages.error(request, "Search for something or pick a filter before saving.")
+    elif len(criteria['query']) > SavedSearch.QUERY_MAX_LENGTH:
+        messages.error(request, f"Saved searches can be up to {SavedSearch.QUERY_MAX_LENGTH} characters. Please shorten it.")
+    elif request.user.saved_searches.count() >= MAX_SAVED_SEARCHES:
+        messages.error(request, f"You can keep up to {MAX_SAVED_SEARCHES} saved searches. Remove one to add another.")
+    else:
+        saved_search = SavedSearch.objects.create(user=request.user, **criteria)
+        messages.success(request, f"Saved {saved_search}. We'll let you know when new listings match.")
+        return redirect(saved_search.get_absolute_url())
+    return redirect('listings:listing_list')
+
+
+@login_required
+def delete_saved_search(request, pk):
+    """
+    Stops alerts for one of the user's saved searches.
+    """
+    saved_search = get_object_or_404(SavedSearch, pk=pk, user=request.user)
+    if request.method == 'POST':
+        saved_search.delete()
+        messages.success(request, f"Removed the saved search {saved_search}.")
+    return redirect('accounts:saved_searches')
+
+
 @login_required
 def remove_from_saved(request, pk):
     """
@@ -416,7 +566,8 @@ def checkout(request):
     Handles the checkout process, creating a new order from the cart safely.
     """
     cart = get_object_or_404(Cart, user=request.user)
-    cart_items = cart.items.select_related('listing').all()
+    # In pk order, so the order's first item matches its summary.
+    cart_items = cart.items.select_related('listing').order_by('pk')
 
     if not cart_items.exists():
         messages.warning(request, "Your cart is empty. Add items before checking out.")
@@ -451,6 +602,7 @@ def checkout(request):
 
                     final_total = grand_total - credit_to_use
                     order.total_price = max(final_total, 0)
+                    order.set_summary(cart_items)
 
                     order.save()
 
@@ -471,6 +623,7 @@ def checkout(request):
                             OrderItem(
                                 order=order,
                                 listing=listing,
+                                seller_id=listing.seller_id,
                                 product_title=listing.title,
                                 quantity=item.quantity,
                                 price=listing.price
@@ -479,9 +632,13 @@ def checkout(request):
                         listing.stock -= item.quantity
                         if listing.stock == 0:
                             listing.status = 'sold'
+                        # bulk_update() skips auto_now, so bump it explicitly
+                        listing.updated_at = timezone.now()
 
                     OrderItem.objects.bulk_create(order_items_to_create)
-                    Listing.objects.bulk_update(listings_for_update, ['stock', 'status'])
+                    SellerOrder.objects.bulk_create(SellerOrder.for_items(order, order_items_to_create))
+                    Listing.objects.bulk_update(listings_for_update, ['stock', 'status', 'updated_at'])
+                    record_order_placed(order, order_items_to_create)
 
                     sellers_to_notify = {item.listing.seller for item in cart_items}
                     for seller in sellers_to_notify:
@@ -573,14 +730,15 @@ def seller_order_detail(request, pk):
     """
     Displays details for a specific order from the seller's perspective.
     """
-    order = get_object_or_404(Order, pk=pk)
-    # Use the centralized model method to check permission
-    if not order.is_seller(request.user):
+    seller_order = SellerOrder.objects.filter(seller=request.user, order_id=pk).select_related('order').first()
+    if seller_order is None:
         raise Http404("You do not have permission to view this order's details.")
 
-    seller_items = order.items.filter(listing__seller=request.user).select_related('listing')
+    order = seller_order.order
+    seller_items = order.items.filter(seller=request.user).select_related('listing')
     context = {
         'order': order,
+        'seller_order': seller_order,
         'seller_items': seller_items
     }
     return render(request, 'listings/seller_order_detail.html', context)
@@ -597,10 +755,15 @@ def view_receipt(request, pk):
         'order': order,
         'order_items': order_items,
         'subtotal': order.total_price - order.shipping_fee,
+        'also_bought': also_bought(
+            [item.listing_id for item in order_items if item.listing_id], exclude_seller=request.user
+        ),
     }
     return render(request, 'listings/receipt.html', context)
 
 
+@rate_limit('search_suggestions')
+@condition(etag_func=search_suggestions_etag)
 def search_suggestions(request):
     """
     Provides search suggestions for listings.
@@ -610,11 +773,12 @@ def search_suggestions(request):
     if len(query) > 0:
         listings = Listing.objects.filter(title__icontains=query, status='available').prefetch_related('images')[:5]
         for listing in listings:
-            first_image = listing.images.first()
+            # Images still uploading have no file yet; .all() uses the prefetch.
+            first_image = next((image.image for image in listing.images.all() if image.image), None)
             data.append({
                 'title': listing.title,
                 'url': listing.get_absolute_url(),
-                'image_url': first_image.image.url if first_image else 'https://via.placeholder.com/40x40?text=No+Img'
+                'image_url': variant_url(first_image, 'thumb') or 'https://via.placeholder.com/40x40?text=No+Img'
             })
     return JsonResponse({'suggestions': data})
 
@@ -625,7 +789,7 @@ def view_invoice(request, pk):
     Displays a seller-specific invoice for an order.
     """
     order = get_object_or_404(Order, pk=pk)
-    is_buyer = order.user == request.user
+    is_buyer = order.user_id == request.user.pk
     # Use the model method to check if the user is a seller for this order
     is_seller = order.is_seller(request.user)
 
@@ -634,7 +798,7 @@ def view_invoice(request, pk):
 
     # Show all items if buyer, otherwise filter to seller's items
     if is_seller and not is_buyer:
-        order_items = order.items.filter(listing__seller=request.user).select_related('listing').prefetch_related(
+        order_items = order.items.filter(seller=request.user).select_related('listing').prefetch_related(
             'listing__images')
     else:
         order_items = order.items.select_related('listing').prefetch_related('listing__images')
@@ -0,0 +1,167 @@
+# marketplace/ratelimit.py
+"""
+Token-bucket rate limiting for views and WebSocket consumers.
+
+Every named limit in settings.RATE_LIMITS is a (rate, burst) pair: a client
+may make `burst` calls at once, after which tokens refill at `rate` per
+second. Buckets live in process memory by default; with Redis configured
+they live there instead, so every worker and node shares them.
+"""
+import logging
+import math
+import threading
+import time
+from functools import lru_cache, wraps
+
+import redis
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import JsonResponse
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryRateLimitBackend:
+    """
+    Buckets in a dict guarded by a lock. Only limits within one process,
+    which is enough for a single-node deployment and for tests.
+    """
+    blocking = False
+    # Once this many buckets exist, those idle for a minute (refilled, for
+    # every configured limit) are dropped.
+    max_buckets = 10000
+
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def consume(self, key, rate, burst, tokens=1):
+        now = time.monotonic()
+        with self._lock:
+            level, updated = self._buckets.get(key, (burst, now))
+            level = min(burst, level + (now - updated) * rate)
+            allowed = level >= tokens
+            if allowed:
+                level -= tokens
+            self._buckets[key] = (level, now)
+            if len(self._buckets) > self.max_buckets:
+                self._prune(now)
+        return allowed
+
+    def _prune(self, now):
+        for key, (_, updated) in list(self._buckets.items()):
+            if now - updated > 60:
+                del self._buckets[key]
+
+
+# Refill and take tokens atomically on the server, using the server's clock
+# so nodes with skewed clocks share one timeline.
+_TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local tokens = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'level', 'updated')
+local level = tonumber(bucket[1]) or burst
+local updated = tonumber(bucket[2]) or now
+level = math.min(burst, level + math.max(0, now - updated) * rate)
+local allowed = 0
+if level >= tokens then
+    level = level - tokens
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'level', tostring(level), 'updated', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return allowed
+"""
+
+
+class RedisRateLimitBackend:
+    """
+    Buckets in Redis hashes, updated by a Lua script. Fails open: if Redis is
+    unreachable the call is allowed rather than taking the site down with it.
+    """
+    blocking = True
+
+    def __init__(self):
+        self._client = redis.Redis.from_url(settings.RATE_LIMIT_REDIS_URL)
+        self._script = self._client.register_script(_TOKEN_BUCKET_SCRIPT)
+
+    def consume(self, key, rate, burst, tokens=1):
+        try:
+            return bool(self._script(keys=[key], args=[rate, burst, tokens]))
+        except redis.RedisError:
+            logger.warning("Rate limit check for %s failed; allowing.", key, exc_info=True)
+            return True
+
+
+@lru_cache(maxsize=1)
+def get_rate_limit_backend():
+    return import_string(settings.RATE_LIMIT_BACKEND)()
+
+
+def allow(limit, key, tokens=1):
+    """
+    Takes tokens from the bucket of `key` under the named limit. Returns False
+    when the bucket is empty.
+    """
+    rate, burst = settings.RATE_LIMITS[limit]
+    return get_rate_limit_backend().consume(f"ratelimit:{limit}:{key}", rate, burst, tokens)
+
+
+async def aallow(limit, key, tokens=1):
+    """
+    Async version of allow(). Only backends doing network I/O leave the event loop.
+    """
+    if get_rate_limit_backend().blocking:
+        return await sync_to_async(allow)(limit, key, tokens)
+    return allow(limit, key, tokens)
+
+
+def client_key(request):
+    """
+    Identifies the caller: the user when logged in, otherwise the client IP.
+    Behind the platform's proxy the last X-Forwarded-For entry is the address
+    the proxy saw; earlier entries are client-supplied.
+    """
+    if request.user.is_authenticated:
+        return f"user:{request.user.pk}"
+    forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
+    if forwarded_for:
+        return f"ip:{forwarded_for.split(',')[-1].strip()}"
+    return f"ip:{request.META.get('REMOTE_ADDR')}"
+
+
+def rate_limit(limit):
+    """
+    View decorator answering 429 Too Many Requests once the caller's bucket
+    under the named limit is empty.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def _wrapped_view(request, *args, **kwargs):
+            if not allow(limit, client_key(request)):
+                rate, burst = settings.RATE_LIMITS[limit]
+                response = JsonResponse({'error': 'Too many requests. Please slow down.'}, status=429)
+                response['Retry-After'] = str(math.ceil(1 / rate))
+                return response
+            return view_func(request, *args, **kwargs)
+        return _wrapped_view
+    return decorator
+
+
+class RateLimitedConsumerMixin:
+    """
+    For AsyncWebsocketConsumer subclasses: frame_allowed() checks an incoming
+    frame against a per-connection bucket and a per-user bucket, so opening
+    more sockets doesn't raise a user's allowance.
+    """
+    connection_rate_limit = 'socket_connection'
+    user_rate_limit = 'socket_user'
+
+    async def frame_allowed(self):
+        if not await aallow(self.connection_rate_limit, self.channel_name):
+            return False
+        return await aallow(self.user_rate_limit, self.scope["user"].pk)
@@ -110,6 +110,22 @@ else:
     }
 
 
+# Cache
+if 'REDIS_URL' in os.environ:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.environ.get('REDIS_URL', 'redis://localhost:6379'),
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+
 # Database
 if 'DATABASE_URL' in os.environ:
     DATABASES = {
@@ -182,6 +198,57 @@ cloudinary.config(
     api_secret=os.environ.get('CLOUDINARY_API_SECRET'),
 )
 
+# Background image uploads (listings/uploads.py). Files are staged on local
+# disk and pushed by a worker pool after the request's transaction commits.
+# On hosts with ephemeral disk (e.g. Heroku/Render dynos) files staged but not
+# yet uploaded are lost on restart, and retry_image_uploads can't recover
+# them; point UPLOAD_STAGING_DIR at a persistent volume where one exists.
+UPLOAD_STAGING_DIR = os.environ.get('UPLOAD_STAGING_DIR', os.path.join(MEDIA_ROOT, 'staging'))
+IMAGE_UPLOAD_BACKEND = os.environ.get('IMAGE_UPLOAD_BACKEND', 'listings.uploads.CloudinaryUploadBackend')
+IMAGE_UPLOAD_WORKERS = int(os.environ.get('IMAGE_UPLOAD_WORKERS', 4))
+IMAGE_UPLOAD_RETRIES = 3
+IMAGE_UPLOAD_RETRY_DELAY = 1
+
+# Named image sizes (listings/images.py). Without a Cloudinary account the
+# local backend builds offline URLs under MEDIA_URL instead.
+if os.environ.get('CLOUDINARY_CLOUD_NAME'):
+    IMAGE_VARIANT_BACKEND = 'listings.images.CloudinaryVariantBackend'
+else:
+    IMAGE_VARIANT_BACKEND = 'listings.images.LocalVariantBackend'
+
+# Support chat messages are buffered per connection and written in batches:
+# when the buffer reaches BATCH_SIZE rows, FLUSH_INTERVAL seconds after the
+# first buffered message, or when the socket closes.
+SUPPORT_MESSAGE_BATCH_SIZE = 20
+SUPPORT_MESSAGE_FLUSH_INTERVAL = 2
+
+# Rate limits (marketplace/ratelimit.py) as (tokens per second, burst).
+# Buckets are shared through Redis when it is configured.
+RATE_LIMITS = {
+    'socket_connection': (1, 5),
+    'socket_user': (2, 10),
+    'toggle_save_listing': (1, 10),
+    'search_suggestions': (5, 20),
+    'filter_listings': (2, 10),
+}
+if 'REDIS_URL' in os.environ:
+    RATE_LIMIT_BACKEND = 'marketplace.ratelimit.RedisRateLimitBackend'
+    RATE_LIMIT_REDIS_URL = os.environ.get('REDIS_URL')
+else:
+    RATE_LIMIT_BACKEND = 'marketplace.ratelimit.MemoryRateLimitBackend'
+
+# Listing views are counted in a buffer (listings/view_counts.py) and added to
+# the database at most every VIEW_COUNT_FLUSH_INTERVAL seconds, by whichever
+# request comes due first or by the flush_view_counts command. Without Redis
+# the buffer is per process: only that process's requests flush it, the command
+# can't, and unflushed views are lost when it restarts.
+VIEW_COUNT_FLUSH_INTERVAL = 60
+if 'REDIS_URL' in os.environ:
+    VIEW_COUNT_BACKEND = 'listings.view_counts.RedisViewCountBackend'
+    VIEW_COUNT_REDIS_URL = os.environ.get('REDIS_URL')
+else:
+    VIEW_COUNT_BACKEND = 'listings.view_counts.MemoryViewCountBackend'
+
 
 # Django Rest Framework
 REST_FRAMEWORK = {
@@ -8,6 +8,7 @@ from django.contrib.auth import views as auth_views
 # Define API patterns separately for better organization
 api_urlpatterns = [
     path('', include('listings.urls_api', namespace='listings_api')),
+    path('', include('accounts.urls_api', namespace='accounts_api')),
 ]
 
 urlpatterns = [
@@ -3,6 +3,7 @@ from django.db import models
 from django.conf import settings
 from django.utils import timezone
 from cloudinary.models import CloudinaryField
+from listings.uploads import UPLOAD_STATUS_CHOICES, UPLOAD_DONE
 
 
 class ConversationManager(models.Manager):
@@ -79,6 +80,9 @@ class Message(models.Model):
     )
     text = models.TextField(blank=True)
     image = CloudinaryField('message_image', blank=True, null=True)
+    # Attachments are uploaded in the background from staged_path (listings/uploads.py).
+    upload_status = models.CharField(max_length=10, choices=UPLOAD_STATUS_CHOICES, default=UPLOAD_DONE)
+    staged_path = models.CharField(max_length=255, blank=True)
     timestamp = models.DateTimeField(auto_now_add=True)
     is_read = models.BooleanField(default=False)
 
@@ -9,6 +9,8 @@ from .forms import MessageForm
 from django.contrib.auth import get_user_model
 from django.contrib import messages
 from listings.models import Listing
+from listings.images import variant_url
+from listings.uploads import stage_upload, enqueue_uploads, UPLOAD_PENDING
 from django.urls import reverse
 from urllib.parse import urlencode
 from django.http import JsonResponse, Http404
@@ -139,14 +141,22 @@ class ConversationDetailView(LoginRequiredMixin, DetailView):
             message.conversation = conversation
             message.sender = request.user
             message.receiver = recipient
+            if message.image:
+                # Upload the attachment in the background instead of in the request.
+                message.staged_path = stage_upload(form.cleaned_data['image'])
+                message.upload_status = UPLOAD_PENDING
+                message.image = None
             message.save()
+            if message.upload_status == UPLOAD_PENDING:
+                enqueue_uploads([message])
 
             if request.headers.get('x-requested-with') == 'XMLHttpRequest':
                 return JsonResponse({
                     'status': 'success',
                     'message': {
                         'text': message.text,
-                        'image_url': message.image.url if message.image else None,
+                        'image_url': variant_url(message.image, 'message') or None,
+                        'image_pending': message.upload_status == UPLOAD_PENDING,
                         'timestamp': message.timestamp.strftime('%Y-%m-%d %H:%M:%S')
                     },
                     'sender_avatar_url': request.user.profile.display_avatar_url
@@ -1,7 +1,11 @@
 # support/bot.py
-import re
 from django.urls import reverse
+from django.utils.html import escape
 from listings.models import Order, Listing, SavedItem
+from .intents import match_intent
+
+# Pending intents carried between messages on SupportChatState.
+INTENT_SEARCH_QUERY = 'search_query'
 
 
 def get_welcome_message():
@@ -24,93 +28,117 @@ def get_welcome_message():
     return message
 
 
-def get_bot_response(user, message, message_history=None):
+async def _search_response(query):
+    results = [listing async for listing in Listing.objects.filter(title__icontains=query, status='available')[:3]]
+    if results:
+        response_lines = [f"I found these results for '<b>{escape(query)}</b>':"]
+        for listing in results:
+            response_lines.append(f"&bull; <a href='{listing.get_absolute_url()}'>{escape(listing.title)}</a>")
+        return "<br>".join(response_lines)
+    return f"I'm sorry, I couldn't find any products matching '<b>{escape(query)}</b>'."
+
+
+async def _order_by_id_response(user, slots, state):
+    order_id = int(slots['order_id'])
+    try:
+        order = await Order.objects.aget(id=order_id, user=user)
+        return f"Order #{order.id} is currently '<b>{order.get_status_display()}</b>'."
+    except Order.DoesNotExist:
+        return f"I couldn't find Order #{order_id} in your purchase history."
+
+
+async def _latest_order_response(user, slots, state):
+    try:
+        latest_order = await Order.objects.filter(user=user).alatest('created_at')
+        return (f"Your latest order, #{latest_order.id}, is currently marked as "
+                f"'<b>{latest_order.get_status_display()}</b>'. You can also ask about a "
+                f"specific order by saying 'status for order #123'.")
+    except Order.DoesNotExist:
+        return "It looks like you haven't placed any orders yet."
+
+
+async def _search_prompt_response(user, slots, state):
+    if state is not None:
+        state.pending_intent = INTENT_SEARCH_QUERY
+    return "Of course! What are you looking for today?"
+
+
+async def _search_slot_response(user, slots, state):
+    return await _search_response(slots['query'].strip())
+
+
+async def _wishlist_response(user, slots, state):
+    saved_items = [item async for item in SavedItem.objects.filter(user=user).select_related('listing')[:5]]
+    if saved_items:
+        response_lines = ["Here are the latest items on your wishlist! ✨"]
+        for item in saved_items:
+            response_lines.append(f"&bull; <a href='{item.listing.get_absolute_url()}'>{escape(item.listing.title)}</a>")
+        return "<br>".join(response_lines)
+    return "Your wishlist is currently empty."
+
+
+async def _how_to_sell_response(user, slots, state):
+    return ("That's great! You can start selling by creating a listing. "
+            f"Just click here to go to the <a href='{reverse('listings:listing_create')}'>Create Listing page</a>.")
+
+
+async def _payment_methods_response(user, slots, state):
+    return "We currently support Cash on Delivery (COD). We are working on adding more payment options in the future!"
+
+
+async def _contact_seller_response(user, slots, state):
+    return ("To contact a seller, please go to the product's page and click the 'Message Seller' button. "
+            "This will open a direct conversation with them.")
+
+
+async def _report_user_response(user, slots, state):
+    return ("I'm sorry to hear you've had an issue. You can file a report using our "
+            f"<a href='{reverse('reports:create_user_report')}'>secure reporting form</a>. Please provide as much detail as possible.")
+
+
+async def _help_response(user, slots, state):
+    return ("How can I help you today? You can ask me about:<br>"
+            "&bull; Your latest order status<br>"
+            "&bull; A specific order (e.g., 'status for order #123')<br>"
+            "&bull; Your wishlist<br>"
+            "&bull; To find products (e.g., 'search for red shoes')<br>"
+            "&bull; How to sell on the platform<br>"
+            "&bull; How to report a user")
+
+
+# Maps each intent in intents.INTENTS to the function that answers it.
+INTENT_HANDLERS = {
+    'order_by_id': _order_by_id_response,
+    'latest_order': _latest_order_response,
+    'search_prompt': _search_prompt_response,
+    'search': _search_slot_response,
+    'wishlist': _wishlist_response,
+    'how_to_sell': _how_to_sell_response,
+    'payment_methods': _payment_methods_response,
+    'contact_seller': _contact_seller_response,
+    'report_user': _report_user_response,
+    'help': _help_response,
+}
+
+
+async def get_bot_response(user, message, state=None):
     """
-    The efficient, rule-based logic for the chatbot.
+    The efficient, rule-based logic for the chatbot. Data access uses the
+    async ORM, so the consumer awaits it without a thread hop.
+
+    `state` is the ticket's SupportChatState. Its pending_intent records a
+    question the bot asked in its previous reply and is updated in place.
     """
-    message_lower = message.lower()
-
-    last_bot_message = ""
-    if message_history and len(message_history) > 1:
-        # Get the bot's last message to see if it was asking a question
-        last_bot_message = message_history[-2].message.lower()
-
-    if "what are you looking for" in last_bot_message:
-        query = message
-        results = Listing.objects.filter(title__icontains=query, status='available')[:3]
-        if results:
-            response_lines = [f"I found these results for '<b>{query}</b>':"]
-            for listing in results:
-                response_lines.append(f"&bull; <a href='{listing.get_absolute_url()}'>{listing.title}</a>")
-            return "<br>".join(response_lines)
-        else:
-            return f"I'm sorry, I couldn't find any products matching '<b>{query}</b>'."
-
-    order_match = re.search(r'order\s*(?:#|number|id)?\s*(\d+)', message_lower)
-    if order_match:
-        order_id = int(order_match.group(1))
-        try:
-            order = Order.objects.get(id=order_id, user=user)
-            return f"Order #{order.id} is currently '<b>{order.get_status_display()}</b>'."
-        except Order.DoesNotExist:
-            return f"I couldn't find Order #{order_id} in your purchase history."
-
-    if any(keyword in message_lower for keyword in ["order status", "my order", "track", "track my order", "where is my order"]):
-        try:
-            latest_order = Order.objects.filter(user=user).latest('created_at')
-            return (f"Your latest order, #{latest_order.id}, is currently marked as "
-                    f"'<b>{latest_order.get_status_display()}</b>'. You can also ask about a "
-                    f"specific order by saying 'status for order #123'.")
-        except Order.DoesNotExist:
-            return "It looks like you haven't placed any orders yet."
-
-    if message_lower == 'search for products':
-        return "Of course! What are you looking for today?"
-
-    search_match = re.search(r'(?:search for|find|looking for|do you have)\s*(.+)', message_lower)
-    if search_match:
-        query = search_match.group(1).strip()
-        results = Listing.objects.filter(title__icontains=query, status='available')[:3]
-        if results:
-            response_lines = [f"I found these results for '<b>{query}</b>':"]
-            for listing in results:
-                response_lines.append(f"&bull; <a href='{listing.get_absolute_url()}'>{listing.title}</a>")
-            return "<br>".join(response_lines)
-        else:
-            return f"I'm sorry, I couldn't find any products matching '<b>{query}</b>'."
-
-    if "wishlist" in message_lower or "saved items" in message_lower or "view my wishlist" in message_lower:
-        saved_items = SavedItem.objects.filter(user=user).select_related('listing')[:5]
-        if saved_items:
-            response_lines = ["Here are the latest items on your wishlist! ✨"]
-            for item in saved_items:
-                response_lines.append(f"&bull; <a href='{item.listing.get_absolute_url()}'>{item.listing.title}</a>")
-            return "<br>".join(response_lines)
-        else:
-            return "Your wishlist is currently empty."
-
-    if any(keyword in message_lower for keyword in ["how to sell", "create a listing", "sell something"]):
-        return ("That's great! You can start selling by creating a listing. "
-                f"Just click here to go to the <a href='{reverse('listings:listing_create')}'>Create Listing page</a>.")
-
-    if any(keyword in message_lower for keyword in ["payment methods", "payment options", "cod"]):
-        return "We currently support Cash on Delivery (COD). We are working on adding more payment options in the future!"
-
-    if any(keyword in message_lower for keyword in ["contact seller", "ask a question"]):
-        return ("To contact a seller, please go to the product's page and click the 'Message Seller' button. "
-                "This will open a direct conversation with them.")
-
-    if any(keyword in message_lower for keyword in ["report a user", "report user", "report someone"]):
-        return ("I'm sorry to hear you've had an issue. You can file a report using our "
-                f"<a href='{reverse('reports:create_user_report')}'>secure reporting form</a>. Please provide as much detail as possible.")
-
-    if "help" in message_lower or "suggestion" in message_lower:
-        return ("How can I help you today? You can ask me about:<br>"
-                "&bull; Your latest order status<br>"
-                "&bull; A specific order (e.g., 'status for order #123')<br>"
-                "&bull; Your wishlist<br>"
-                "&bull; To find products (e.g., 'search for red shoes')<br>"
-                "&bull; How to sell on the platform<br>"
-                "&bull; How to report a user")
-
-    return "I'm sorry, I don't understand that. You can ask me for 'help' to see what I can do."
\ No newline at end of file
+    pending_intent = ''
+    if state is not None:
+        pending_intent = state.pending_intent
+        state.pending_intent = ''
+
+    if pending_intent == INTENT_SEARCH_QUERY:
+        return await _search_response(message)
+
+    intent = match_intent(message.lower())
+    if intent is not None:
+        return await INTENT_HANDLERS[intent.name](user, intent.slots, state)
+
+    return "I'm sorry, I don't understand that. You can ask me for 'help' to see what I can do."
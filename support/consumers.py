@@ -1,12 +1,34 @@
 # support/consumers.py
+import asyncio
 import json
+import logging
 from channels.generic.websocket import AsyncWebsocketConsumer
-from channels.db import database_sync_to_async
-from .models import SupportTicket, SupportMessage
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError
+from django.utils import timezone
+from django.utils.html import strip_tags
+from marketplace.ratelimit import RateLimitedConsumerMixin
+from .models import SupportTicket, SupportMessage, SupportChatState
 from .bot import get_bot_response, get_welcome_message  # Import both functions
 
+logger = logging.getLogger(__name__)
 
-class SupportConsumer(AsyncWebsocketConsumer):
+SUPPORT_TICKET_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def support_ticket_cache_key(user_id):
+    """Cache key of the user's open ticket id, set by chat_view and the consumer."""
+    return f'support_ticket:{user_id}'
+
+# The flush on disconnect is the last chance to save the buffer, so a failed
+# batch is retried this many times (doubling the delay) before falling back
+# to saving the messages one by one.
+DISCONNECT_FLUSH_ATTEMPTS = 3
+DISCONNECT_FLUSH_RETRY_DELAY = 0.5
+
+
+class SupportConsumer(RateLimitedConsumerMixin, AsyncWebsocketConsumer):
     async def connect(self):
         self.user = self.scope["user"]
         if not self.user.is_authenticated:
@@ -14,7 +36,12 @@ class SupportConsumer(AsyncWebsocketConsumer):
             return
 
         self.ticket = await self.get_or_create_ticket()
+        # Conversational state lives on the connection; the row is only read here.
+        self.chat_state = await self.get_chat_state()
         self.room_group_name = f'support_{self.ticket.id}'
+        # Messages waiting to be written, flushed by size, timer or disconnect.
+        self.pending_messages = []
+        self.flush_task = None
 
         await self.channel_layer.group_add(
             self.room_group_name,
@@ -32,6 +59,10 @@ class SupportConsumer(AsyncWebsocketConsumer):
         }))
 
     async def disconnect(self, close_code):
+        if hasattr(self, 'pending_messages'):
+            if self.flush_task is not None:
+                self.flush_task.cancel()
+            await self.flush_remaining_messages()
         if hasattr(self, 'room_group_name'):
             await self.channel_layer.group_discard(
                 self.room_group_name,
@@ -39,26 +70,32 @@ class SupportConsumer(AsyncWebsocketConsumer):
             )
 
     async def receive(self, text_data):
+        # Frames over the limit are dropped before any parsing or DB work.
+        if not await self.frame_allowed():
+            await self.send(text_data=json.dumps({
+                'sender': 'bot',
+                'message': "You're sending messages too quickly. Please wait a moment and try again.",
+            }))
+            return
+
         data = json.loads(text_data)
         message = data['message']
 
-        # Save and broadcast the user's message
-        await self.save_message('user', message)
+        # Broadcast the user's message straight away
         await self.channel_layer.group_send(
             self.room_group_name,
             {'type': 'chat_message', 'sender': 'user', 'message': message}
         )
 
         # Get and broadcast the bot's response
-        message_history = await self.get_message_history()
-        bot_response = await self.get_bot_response_async(message, message_history)
-
-        await self.save_message('bot', bot_response)
+        bot_response = await self.get_bot_response_async(message)
         await self.channel_layer.group_send(
             self.room_group_name,
             {'type': 'chat_message', 'sender': 'bot', 'message': bot_response}
         )
 
+        await self.queue_messages([('user', message), ('bot', bot_response)])
+
     async def chat_message(self, event):
         # This function sends messages from the group to the WebSocket
         await self.send(text_data=json.dumps({
@@ -66,25 +103,106 @@ class SupportConsumer(AsyncWebsocketConsumer):
             'message': event['message'],
         }))
 
-    @database_sync_to_async
-    def get_or_create_ticket(self):
-        ticket, created = SupportTicket.objects.get_or_create(user=self.user, status__in=['open', 'escalated'])
-        if not created and ticket.status == 'closed':
-            # Create a new ticket if the latest one is closed
-            ticket = SupportTicket.objects.create(user=self.user, status='open')
+    async def get_or_create_ticket(self):
+        """
+        Returns the user's open ticket, creating one if needed. The id is cached
+        per user so a reconnect is a single primary-key lookup; otherwise the
+        partial unique index on open tickets answers the lookup by user.
+        """
+        cache_key = support_ticket_cache_key(self.user.pk)
+        open_tickets = SupportTicket.objects.filter(status__in=SupportTicket.OPEN_STATUSES)
+
+        ticket_id = await cache.aget(cache_key)
+        ticket = None
+        if ticket_id is not None:
+            # The cached ticket may have been closed or deleted since.
+            ticket = await open_tickets.filter(pk=ticket_id, user=self.user).afirst()
+        if ticket is None:
+            ticket = await open_tickets.filter(user=self.user).afirst()
+        if ticket is None:
+            try:
+                ticket = await SupportTicket.objects.acreate(user=self.user, status='open')
+            except IntegrityError:
+                # Another connection created it first.
+                ticket = await open_tickets.aget(user=self.user)
+        if ticket.pk != ticket_id:
+            await cache.aset(cache_key, ticket.pk, SUPPORT_TICKET_CACHE_TIMEOUT)
         return ticket
 
-    @database_sync_to_async
-    def save_message(self, sender, message):
-        # Prevents saving the raw HTML suggestion links as messages
-        if "chat-suggestion" in message and sender == 'user':
-            return
-        return SupportMessage.objects.create(ticket=self.ticket, sender=sender, message=message)
-
-    @database_sync_to_async
-    def get_message_history(self):
-        return list(self.ticket.messages.all().order_by('timestamp'))
-
-    @database_sync_to_async
-    def get_bot_response_async(self, message, message_history):
-        return get_bot_response(self.user, message, message_history)
\ No newline at end of file
+    async def queue_messages(self, messages):
+        for sender, message in messages:
+            # Prevents saving the raw HTML suggestion links as messages
+            if sender == 'user' and "chat-suggestion" in message:
+                continue
+            # Timestamped now so rows keep the time they were sent, not flushed.
+            self.pending_messages.append(SupportMessage(
+                ticket=self.ticket, sender=sender, message=message, timestamp=timezone.now()
+            ))
+
+        if len(self.pending_messages) >= settings.SUPPORT_MESSAGE_BATCH_SIZE:
+            await self.flush_messages()
+        elif self.pending_messages and self.flush_task is None:
+            self.flush_task = asyncio.ensure_future(self.flush_after_delay())
+
+    async def flush_after_delay(self):
+        await asyncio.sleep(settings.SUPPORT_MESSAGE_FLUSH_INTERVAL)
+        self.flush_task = None
+        if not await self.flush_messages() and self.flush_task is None:
+            # Try again after another interval rather than waiting for the next message.
+            self.flush_task = asyncio.ensure_future(self.flush_after_delay())
+
+    async def flush_messages(self):
+        """
+        Writes the buffered messages in one bulk INSERT. A failed write puts
+        them back at the head of the buffer for the next flush and returns
+        False.
+        """
+        if not self.pending_messages:
+            return True
+        batch, self.pending_messages = self.pending_messages, []
+        try:
+            await SupportMessage.objects.abulk_create(batch)
+        except IntegrityError:
+            # The ticket was deleted under us (a new chat was started).
+            logger.warning("Dropped %s messages for deleted support ticket #%s.", len(batch), self.ticket.id)
+        except Exception:
+            logger.exception("Failed to save %s messages for support ticket #%s.", len(batch), self.ticket.id)
+            self.pending_messages = batch + self.pending_messages
+            return False
+        return True
+
+    async def flush_remaining_messages(self):
+        """
+        Final flush on disconnect, when nothing will retry later: the batch is
+        retried a few times, then saved row by row, and any message that still
+        can't be written is logged.
+        """
+        for attempt in range(DISCONNECT_FLUSH_ATTEMPTS):
+            if await self.flush_messages():
+                return
+            if attempt + 1 < DISCONNECT_FLUSH_ATTEMPTS:
+                await asyncio.sleep(DISCONNECT_FLUSH_RETRY_DELAY * 2 ** attempt)
+
+        batch, self.pending_messages = self.pending_messages, []
+        for message in batch:
+            try:
+                await message.asave()
+            except Exception:
+                logger.exception(
+                    "Lost %s message sent at %s for support ticket #%s: %r",
+                    message.sender, message.timestamp.isoformat(), self.ticket.id, message.message,
+                )
+
+    async def get_chat_state(self):
+        chat_state, created = await SupportChatState.objects.aget_or_create(ticket=self.ticket)
+        return chat_state
+
+    async def get_bot_response_async(self, message):
+        previous_intent = self.chat_state.pending_intent
+        response = await get_bot_response(self.user, message, self.chat_state)
+        self.chat_state.last_bot_prompt = strip_tags(response)[:255]
+        # Only a change of pending intent matters after a reconnect, so the
+        # row is written when that changes rather than on every message.
+        if self.chat_state.pending_intent != previous_intent:
+            await self.chat_state.asave(update_fields=['pending_intent', 'last_bot_prompt', 'updated_at'])
+        return response
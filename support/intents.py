@@ -0,0 +1,152 @@
+# support/intents.py
+"""
+Declarative intent table for the support bot.
+
+The table is compiled once, at import, into an Aho–Corasick automaton over
+every keyword and every pattern's literal prefix. Matching a message is a
+single pass over its characters whatever the size of the table, so adding an
+intent doesn't lengthen the per-message work.
+"""
+import re
+from collections import deque, namedtuple
+
+# `keywords` are matched as plain substrings, `patterns` as regular expressions.
+# Named groups in a pattern, e.g. (?P<order_id>...), become slots on the match.
+# A pattern must start with literal text (its trigger word), optionally after
+# a '^' anchor, and must not use top-level alternation.
+Intent = namedtuple('Intent', ['name', 'keywords', 'patterns'])
+
+# Ordered by priority: when a message matches several intents, the first wins.
+INTENTS = (
+    Intent('order_by_id', (), (r'order\s*(?:#|number|id)?\s*(?P<order_id>\d+)',)),
+    Intent('latest_order', ('order status', 'my order', 'track', 'where is my order'), ()),
+    Intent('search_prompt', (), (r'^search for products\Z',)),
+    Intent('search', (), (
+        r'search for\s*(?P<query>.+)',
+        r'find\s*(?P<query>.+)',
+        r'looking for\s*(?P<query>.+)',
+        r'do you have\s*(?P<query>.+)',
+    )),
+    Intent('wishlist', ('wishlist', 'saved items'), ()),
+    Intent('how_to_sell', ('how to sell', 'create a listing', 'sell something'), ()),
+    Intent('payment_methods', ('payment methods', 'payment options', 'cod'), ()),
+    Intent('contact_seller', ('contact seller', 'ask a question'), ()),
+    Intent('report_user', ('report a user', 'report user', 'report someone'), ()),
+    Intent('help', ('help', 'suggestion'), ()),
+)
+
+IntentMatch = namedtuple('IntentMatch', ['name', 'slots'])
+
+# A keyword or pattern prefix in the automaton. `regex` is set for patterns
+# and is run at the trigger's position to confirm the match and fill slots.
+_Trigger = namedtuple('_Trigger', ['intent', 'priority', 'length', 'regex'])
+
+_REGEX_SPECIAL = set('\\.^$*+?{}[]()|')
+_QUANTIFIERS = set('*+?{')
+
+
+def _literal_prefix(pattern):
+    """
+    Returns the literal text a pattern must start with, ignoring a leading '^'.
+    """
+    if pattern.startswith('^'):
+        pattern = pattern[1:]
+    prefix = []
+    for char in pattern:
+        if char in _REGEX_SPECIAL:
+            # A quantifier makes the preceding character optional.
+            if char in _QUANTIFIERS and prefix:
+                prefix.pop()
+            break
+        prefix.append(char)
+    return ''.join(prefix)
+
+
+class IntentMatcher:
+    """
+    Aho–Corasick automaton over an intent table.
+
+    Goto and failure links are folded into one transition dict per state, so
+    scanning costs one dict lookup per character. Each state lists the
+    triggers ending there, best priority first.
+    """
+
+    def __init__(self, intents):
+        self._no_match = len(intents)
+        transitions = [{}]
+        outputs = [[]]
+
+        for priority, intent in enumerate(intents):
+            triggers = [(keyword, None) for keyword in intent.keywords]
+            for pattern in intent.patterns:
+                prefix = _literal_prefix(pattern)
+                if not prefix:
+                    raise ValueError(f"Intent '{intent.name}': '{pattern}' must start with literal text.")
+                triggers.append((prefix, re.compile(pattern)))
+
+            for text, regex in triggers:
+                state = 0
+                for char in text:
+                    if char not in transitions[state]:
+                        transitions.append({})
+                        outputs.append([])
+                        transitions[state][char] = len(transitions) - 1
+                    state = transitions[state][char]
+                outputs[state].append(_Trigger(intent.name, priority, len(text), regex))
+
+        # Breadth-first pass: resolve failure links into full transitions and
+        # inherit the outputs of the longest proper suffix state.
+        alphabet = {char for state in transitions for char in state}
+        fail = [0] * len(transitions)
+        queue = deque()
+        for char, child in transitions[0].items():
+            queue.append(child)
+        while queue:
+            state = queue.popleft()
+            outputs[state] = outputs[state] + outputs[fail[state]]
+            for char in alphabet:
+                child = transitions[state].get(char)
+                if child is None:
+                    target = transitions[fail[state]].get(char)
+                    if target is not None:
+                        transitions[state][char] = target
+                else:
+                    fail[child] = transitions[fail[state]].get(char, 0)
+                    queue.append(child)
+
+        self._transitions = transitions
+        self._outputs = [tuple(sorted(output, key=lambda trigger: trigger.priority)) for output in outputs]
+
+    def match(self, text):
+        """
+        Returns the highest-priority IntentMatch for a lower-cased message, or
+        None. Among matches of the same intent, the leftmost one supplies the slots.
+        """
+        transitions = self._transitions
+        outputs = self._outputs
+        best = None
+        best_rank = (self._no_match, 0)
+        state = 0
+        for end, char in enumerate(text, 1):
+            state = transitions[state].get(char, 0)
+            if not outputs[state]:
+                continue
+            for trigger in outputs[state]:
+                if trigger.priority > best_rank[0]:
+                    break
+                start = end - trigger.length
+                if (trigger.priority, start) >= best_rank:
+                    continue
+                if trigger.regex is None:
+                    slots = {}
+                else:
+                    # '^' in the pattern still only matches at the real start of text.
+                    match = trigger.regex.match(text, start)
+                    if match is None:
+                        continue
+                    slots = match.groupdict()
+                best, best_rank = IntentMatch(trigger.intent, slots), (trigger.priority, start)
+        return best
+
+
+match_intent = IntentMatcher(INTENTS).match
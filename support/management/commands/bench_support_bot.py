@@ -0,0 +1,106 @@
+# support/management/commands/bench_support_bot.py
+import re
+import time
+
+from django.core.management.base import BaseCommand
+
+from support.intents import INTENTS, Intent, IntentMatch, IntentMatcher
+
+# Realistic support messages, including ones that match no intent.
+CORPUS = (
+    "Track my order",
+    "where is my order??",
+    "hi, what's the status of order #1042",
+    "order number 77 hasn't arrived yet",
+    "can you check order id 3051 for me",
+    "Search for products",
+    "search for red running shoes",
+    "do you have any iphone 13 cases",
+    "I'm looking for a second hand bike in cebu",
+    "find wooden dining table",
+    "View my wishlist",
+    "show me my saved items please",
+    "How to sell",
+    "how do i create a listing with photos",
+    "i want to sell something i no longer use",
+    "what payment methods do you accept",
+    "is cod available in davao",
+    "how can I contact seller about shipping",
+    "Report a user",
+    "i need to report someone who scammed me",
+    "help",
+    "any suggestion on what i can ask?",
+    "hello",
+    "thanks!",
+    "the item I received is broken and the box was open when it arrived at my place yesterday",
+    "ok",
+)
+
+
+class SequentialMatcher:
+    """
+    Baseline: tests each intent in priority order with its own re.search and
+    substring checks, the way the bot matched messages before the table was
+    compiled.
+    """
+
+    def __init__(self, intents):
+        self.intents = [
+            (intent.name, [re.compile(pattern) for pattern in intent.patterns], intent.keywords)
+            for intent in intents
+        ]
+
+    def match(self, text):
+        for name, patterns, keywords in self.intents:
+            for pattern in patterns:
+                match = pattern.search(text)
+                if match:
+                    return IntentMatch(name, match.groupdict())
+            for keyword in keywords:
+                if keyword in text:
+                    return IntentMatch(name, {})
+        return None
+
+
+def synthetic_intents(count):
+    """
+    Extra low-priority intents, to show how matching cost grows with the table.
+    """
+    return tuple(
+        Intent(f'faq_{index}', (f'faq topic {index}', f'question about item {index}'), ())
+        for index in range(count)
+    )
+
+
+class Command(BaseCommand):
+    help = "Times the support bot's intent matcher over a corpus of realistic messages (no database access)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20000)
+        parser.add_argument('--synthetic', type=int, default=0,
+                            help="Append this many synthetic intents to the table.")
+
+    def handle(self, *args, **options):
+        intents = INTENTS + synthetic_intents(options['synthetic'])
+        messages = [message.lower() for message in CORPUS]
+        compiled = IntentMatcher(intents)
+        sequential = SequentialMatcher(intents)
+
+        for message in messages:
+            intent = compiled.match(message)
+            if intent != sequential.match(message):
+                self.stderr.write(f"Matchers disagree on {message!r}")
+            self.stdout.write(f"{message[:60]!r:64} -> {intent.name if intent else '-'}")
+
+        self.stdout.write(f"{len(intents)} intents, {len(messages)} messages x {options['iterations']} iterations")
+        for label, matcher in (('sequential', sequential), ('compiled', compiled)):
+            self.stdout.write(self.style.SUCCESS(
+                f"{label:>10}: {self._time(matcher.match, messages, options['iterations']):.2f} µs per message"
+            ))
+
+    def _time(self, match, messages, iterations):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            for message in messages:
+                match(message)
+        return (time.perf_counter() - start) / (iterations * len(messages)) * 1e6
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.5 on 2026-10-19 19:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('support', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SupportChatState',
+            fields=[
+                ('ticket', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='chat_state', serialize=False, to='support.supportticket')),
+                ('pending_intent', models.CharField(blank=True, max_length=30)),
+                ('last_bot_prompt', models.CharField(blank=True, max_length=255)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.5 on 2026-10-19 20:02
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('support', '0002_supportchatstate'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='supportmessage',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.5 on 2026-10-19 20:04
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def close_duplicate_open_tickets(apps, schema_editor):
+    # Keep each user's newest open ticket; close the rest so the index can be built.
+    SupportTicket = apps.get_model('support', 'SupportTicket')
+    seen_users = set()
+    duplicate_ids = []
+    open_tickets = SupportTicket.objects.filter(status__in=('open', 'escalated')).order_by('user_id', '-created_at', '-id')
+    for ticket_id, user_id in open_tickets.values_list('id', 'user_id').iterator():
+        if user_id in seen_users:
+            duplicate_ids.append(ticket_id)
+        seen_users.add(user_id)
+    SupportTicket.objects.filter(id__in=duplicate_ids).update(status='closed')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('support', '0003_support_message_send_timestamp'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(close_duplicate_open_tickets, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='supportticket',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ('open', 'escalated'))), fields=('user',), name='support_one_open_ticket_per_user'),
+        ),
+    ]
@@ -1,17 +1,30 @@
 # support/models.py
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 
 class SupportTicket(models.Model):
     STATUS_CHOICES = (
         ('open', 'Open'),
         ('closed', 'Closed'),
     )
+    # Statuses of a ticket that is still in progress; a user has at most one.
+    OPEN_STATUSES = ('open', 'escalated')
+
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='support_tickets')
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='open')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        constraints = [
+            # Partial unique index: also serves the "current ticket" lookup.
+            models.UniqueConstraint(
+                fields=['user'], condition=models.Q(status__in=('open', 'escalated')),
+                name='support_one_open_ticket_per_user'
+            ),
+        ]
+
     def __str__(self):
         return f"Ticket #{self.id} for {self.user.username}"
 
@@ -23,10 +36,26 @@ class SupportMessage(models.Model):
     ticket = models.ForeignKey(SupportTicket, on_delete=models.CASCADE, related_name='messages')
     sender = models.CharField(max_length=10, choices=SENDER_CHOICES)
     message = models.TextField()
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # Set when the message is sent; SupportConsumer writes messages in batches.
+    timestamp = models.DateTimeField(default=timezone.now, editable=False)
 
     class Meta:
         ordering = ['timestamp']
 
     def __str__(self):
-        return f"Message from {self.get_sender_display()} in Ticket #{self.ticket.id}"
\ No newline at end of file
+        return f"Message from {self.get_sender_display()} in Ticket #{self.ticket.id}"
+
+
+class SupportChatState(models.Model):
+    """
+    The bot's conversational state for a ticket. SupportConsumer keeps it in
+    memory for the life of the socket and only writes it back when it changes,
+    so reconnects resume mid-conversation without replaying the message history.
+    """
+    ticket = models.OneToOneField(SupportTicket, on_delete=models.CASCADE, primary_key=True, related_name='chat_state')
+    pending_intent = models.CharField(max_length=30, blank=True)
+    last_bot_prompt = models.CharField(max_length=255, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Chat state for Ticket #{self.ticket_id}"
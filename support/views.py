@@ -1,6 +1,8 @@
 # support/views.py
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
+from django.core.cache import cache
+from .consumers import SUPPORT_TICKET_CACHE_TIMEOUT, support_ticket_cache_key
 from .models import SupportTicket
 
 
@@ -11,5 +13,7 @@ def chat_view(request):
 
     # This will now always create a new ticket.
     ticket, created = SupportTicket.objects.get_or_create(user=request.user, status='open')
+    # The chat socket connects right after this page loads; point it straight at the new ticket.
+    cache.set(support_ticket_cache_key(request.user.pk), ticket.pk, SUPPORT_TICKET_CACHE_TIMEOUT)
 
-    return render(request, 'support/chat.html', {'ticket': ticket})
\ No newline at end of file
+    return render(request, 'support/chat.html', {'ticket': ticket})